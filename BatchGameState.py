@@ -0,0 +1,277 @@
+import numpy as np
+
+from BoardState import BOARD_INITIAL_SIZE, SUM_TURNS_PLACE_PHASE, FIRST_BOARD_SHRINK, SECOND_BOARD_SHRINK
+
+# square codes of the boards
+EMPTY = 0
+WHITE = 1
+BLACK = 2
+CORNER = 3
+# square removed from the board by a shrink
+OFF = 4
+
+# codes of the winners
+NO_WINNER = 0
+WHITE_WINS = 1
+BLACK_WINS = 2
+DRAW = 3
+WINNER_NAMES = {NO_WINNER: None, WHITE_WINS: 'W', BLACK_WINS: 'B', DRAW: 'draw'}
+
+# the boards are padded with 2 OFF squares on every side, so a square and the
+# two squares after it in any direction can be read without bound checks
+PAD = 2
+PADDED_SIZE = BOARD_INITIAL_SIZE + 2 * PAD
+
+# (dy, dx) of the 4 directions, and the index of each in the legal moves arrays
+DIRECTIONS = ((0, -1), (-1, 0), (0, 1), (1, 0))
+
+
+class BatchGameState:
+    """
+    N games of Watch Your Back! advanced together with NumPy array operations.
+    The boards are an (N, 8, 8) int8 array (see board), indexed [game, y, x] like the referee.
+    All the games of a batch play the same turn at the same time, so turns and phase are shared,
+    and a game that is completed simply ignores the next actions.
+    Placing, moving, captures, shrinking and wins follow the referee's _Game exactly, for legal
+    actions: actions are not validated, use legal_placements / legal_moves to generate them.
+    """
+    def __init__(self, n_games):
+        self._padded = np.full((n_games, PADDED_SIZE, PADDED_SIZE), OFF, dtype=np.int8)
+        self._padded[:, PAD:PAD + BOARD_INITIAL_SIZE, PAD:PAD + BOARD_INITIAL_SIZE] = EMPTY
+        for x, y in self._corners(0):
+            self._padded[:, y, x] = CORNER
+
+        self.n_games = n_games
+        self.turns = 0
+        self.phase = 'placing'
+        self.n_shrinks = 0
+        # pieces[game, 0] is the number of white pieces, pieces[game, 1] of black pieces
+        self.pieces = np.zeros((n_games, 2), dtype=np.int16)
+        self.winner = np.full(n_games, NO_WINNER, dtype=np.int8)
+
+    @classmethod
+    def from_game(cls, game, n_games):
+        """
+        :param game: a referee _Game
+        :return: a batch of n_games copies of the state of game
+        """
+        batch = cls(n_games)
+        codes = {'-': EMPTY, 'W': WHITE, 'B': BLACK, 'X': CORNER, ' ': OFF}
+        board = np.array([[codes[square] for square in row] for row in game.board], dtype=np.int8)
+        batch.board[:] = board
+        batch.turns = game.turns
+        batch.phase = game.phase
+        batch.n_shrinks = game.n_shrinks
+        batch.pieces[:] = (game.pieces['W'], game.pieces['B'])
+        return batch
+
+    @property
+    def board(self):
+        """(N, 8, 8) int8 view of the boards, indexed [game, y, x]"""
+        return self._padded[:, PAD:PAD + BOARD_INITIAL_SIZE, PAD:PAD + BOARD_INITIAL_SIZE]
+
+    def playing(self):
+        """:return: boolean array, True for the games still in progress"""
+        return self.winner == NO_WINNER
+
+    def winners(self):
+        """:return: list of the winner of every game, 'W', 'B', 'draw' or None, like _Game.winner"""
+        return [WINNER_NAMES[winner] for winner in self.winner]
+
+    def piece(self):
+        """:return: code of the pieces of the player with the current turn"""
+        return WHITE if self.turns % 2 == 0 else BLACK
+
+    # ----------------------------------------------------------------------- #
+    # legal actions
+
+    def legal_placements(self):
+        """
+        :return: (N, 8, 8) boolean array of the squares the current player may place on
+        """
+        legal = self.board == EMPTY
+        if self.piece() == WHITE:
+            legal[:, BOARD_INITIAL_SIZE - 2:, :] = False
+        else:
+            legal[:, :2, :] = False
+        return legal
+
+    def legal_moves(self):
+        """
+        :return: (N, 8, 8, 4, 2) boolean array, [game, y, x, direction, jump] is True iff the piece
+        of the current player on (x, y) may move (jump 0) or jump (jump 1) in DIRECTIONS[direction]
+        """
+        padded = self._padded
+        size = BOARD_INITIAL_SIZE
+        own = self.board == self.piece()
+        legal = np.zeros(own.shape + (len(DIRECTIONS), 2), dtype=bool)
+        for direction, (dy, dx) in enumerate(DIRECTIONS):
+            step = padded[:, PAD + dy:PAD + dy + size, PAD + dx:PAD + dx + size]
+            jump = padded[:, PAD + 2 * dy:PAD + 2 * dy + size, PAD + 2 * dx:PAD + 2 * dx + size]
+            legal[..., direction, 0] = own & (step == EMPTY)
+            legal[..., direction, 1] = own & ((step == WHITE) | (step == BLACK)) & (jump == EMPTY)
+        return legal
+
+    def random_actions(self, rng):
+        """
+        pick a uniformly random legal action for every game
+        :param rng: numpy random Generator
+        :return: (x, y) arrays of placements in the placing phase, otherwise (xa, ya, xb, yb, forfeit)
+        arrays of moves, forfeit being True for the games without a legal move
+        """
+        n = self.n_games
+        if self.phase == 'placing':
+            legal = self.legal_placements().reshape(n, -1)
+            choice = np.argmax(np.where(legal, rng.random(legal.shape), -1.0), axis=1)
+            return choice % BOARD_INITIAL_SIZE, choice // BOARD_INITIAL_SIZE
+
+        legal = self.legal_moves()
+        flat = legal.reshape(n, -1)
+        choice = np.argmax(np.where(flat, rng.random(flat.shape), -1.0), axis=1)
+        forfeit = ~flat.any(axis=1)
+        y, x, direction, jump = np.unravel_index(choice, legal.shape[1:])
+        distance = jump + 1
+        dy = np.array([d[0] for d in DIRECTIONS])[direction]
+        dx = np.array([d[1] for d in DIRECTIONS])[direction]
+        return x, y, x + dx * distance, y + dy * distance, forfeit
+
+    # ----------------------------------------------------------------------- #
+    # updates
+
+    def place(self, x, y):
+        """
+        every game in progress places a piece of the current player on (x[game], y[game])
+        """
+        games = np.flatnonzero(self.playing())
+        piece = self.piece()
+        ys, xs = np.asarray(y)[games] + PAD, np.asarray(x)[games] + PAD
+        self._padded[games, ys, xs] = piece
+        self.pieces[games, piece - 1] += 1
+        self._eliminate_about(games, ys, xs, piece)
+        self._progress()
+
+    def move(self, xa, ya, xb, yb, forfeit=None):
+        """
+        every game in progress moves a piece of the current player from (xa, ya) to (xb, yb),
+        or doesn't move at all where forfeit is True
+        """
+        playing = self.playing()
+        if forfeit is not None:
+            playing &= ~np.asarray(forfeit, dtype=bool)
+        games = np.flatnonzero(playing)
+        piece = self.piece()
+        ys, xs = np.asarray(yb)[games] + PAD, np.asarray(xb)[games] + PAD
+        self._padded[games, np.asarray(ya)[games] + PAD, np.asarray(xa)[games] + PAD] = EMPTY
+        self._padded[games, ys, xs] = piece
+        self._eliminate_about(games, ys, xs, piece)
+        self._progress()
+
+    def play_random(self, rng):
+        """advance every game in progress by one uniformly random legal action"""
+        actions = self.random_actions(rng)
+        if self.phase == 'placing':
+            self.place(*actions)
+        else:
+            self.move(*actions)
+
+    def rollout(self, rng):
+        """
+        play random legal actions until every game is completed
+        :return: array of the winner codes
+        """
+        while self.playing().any():
+            self.play_random(rng)
+        return self.winner
+
+    def _progress(self):
+        # same progression as _Game.update
+        self.turns += 1
+        if self.phase == 'placing' and self.turns == SUM_TURNS_PLACE_PHASE:
+            self.phase = 'moving'
+            self.turns = 0
+        if self.phase == 'moving':
+            self._check_win()
+            if self.turns in (FIRST_BOARD_SHRINK, SECOND_BOARD_SHRINK):
+                self._shrink_board(np.flatnonzero(self.playing()))
+                self._check_win()
+
+    def _check_win(self):
+        playing = self.playing()
+        white_out = self.pieces[:, 0] < 2
+        black_out = self.pieces[:, 1] < 2
+        self.winner[playing & white_out & ~black_out] = BLACK_WINS
+        self.winner[playing & black_out & ~white_out] = WHITE_WINS
+        self.winner[playing & white_out & black_out] = DRAW
+
+    def _corners(self, s):
+        """:return: padded (x, y) of the corners after s shrinks, in the referee's order"""
+        last = BOARD_INITIAL_SIZE - 1 - s
+        return [(PAD + x, PAD + y) for x, y in ((s, s), (s, last), (last, last), (last, s))]
+
+    def _shrink_board(self, games):
+        """
+        shrink the boards of games, eliminating the pieces on the outermost layer and replacing
+        the corners, like _Game._shrink_board
+        """
+        s = self.n_shrinks
+        low, high = PAD + s, PAD + BOARD_INITIAL_SIZE - 1 - s
+
+        # remove edges
+        ring = np.zeros((PADDED_SIZE, PADDED_SIZE), dtype=bool)
+        ring[low:high + 1, low:high + 1] = True
+        ring[low + 1:high, low + 1:high] = False
+        boards = self._padded[games]
+        for piece in (WHITE, BLACK):
+            self.pieces[games, piece - 1] -= ((boards == piece) & ring).sum(axis=(1, 2)).astype(np.int16)
+        boards[:, ring] = OFF
+        self._padded[games] = boards
+
+        self.n_shrinks = s = s + 1
+
+        # replace the corners (and perform corner elimination)
+        for x, y in self._corners(s):
+            square = self._padded[games, y, x]
+            for piece in (WHITE, BLACK):
+                self.pieces[games[square == piece], piece - 1] -= 1
+            self._padded[games, y, x] = CORNER
+            ys = np.full(len(games), y)
+            xs = np.full(len(games), x)
+            self._eliminate_about(games, ys, xs, CORNER)
+
+    def _eliminate_about(self, games, ys, xs, piece):
+        """
+        A piece has entered (xs[i], ys[i]) of game games[i]: eliminate adjacent surrounded enemy
+        pieces, then possibly eliminate this piece too, like _Game._eliminate_about.
+        :param ys: padded rows
+        :param xs: padded columns
+        :param piece: code of the piece that entered the squares (WHITE, BLACK or CORNER)
+        """
+        padded = self._padded
+        for dy, dx in DIRECTIONS:
+            target_y, target_x = ys + dy, xs + dx
+            target = padded[games, target_y, target_x]
+            beyond = padded[games, ys + 2 * dy, xs + 2 * dx]
+            if piece == CORNER:
+                # a corner eliminates any piece with an enemy (or corner) on its other side
+                captured = ((target == WHITE) & ((beyond == BLACK) | (beyond == CORNER))) | \
+                           ((target == BLACK) & ((beyond == WHITE) | (beyond == CORNER)))
+            else:
+                captured = (target == 3 - piece) & ((beyond == piece) | (beyond == CORNER))
+            if captured.any():
+                captured_games = games[captured]
+                padded[captured_games, target_y[captured], target_x[captured]] = EMPTY
+                np.subtract.at(self.pieces, (captured_games, target[captured].astype(np.intp) - 1), 1)
+
+        if piece == CORNER:
+            return
+
+        enemy = 3 - piece
+
+        def hostile(dy, dx):
+            square = padded[games, ys + dy, xs + dx]
+            return (square == enemy) | (square == CORNER)
+
+        surrounded = (hostile(0, -1) & hostile(0, 1)) | (hostile(-1, 0) & hostile(1, 0))
+        if surrounded.any():
+            padded[games[surrounded], ys[surrounded], xs[surrounded]] = EMPTY
+            self.pieces[games[surrounded], piece - 1] -= 1
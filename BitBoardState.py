@@ -0,0 +1,596 @@
+from BoardState import BOARD_INITIAL_SIZE, SUM_TURNS_PLACE_PHASE, SQUARE_RANKS, shrink_level
+from Zobrist import PIECE_KEYS, PLACE_PHASE_KEY, SHRINK_KEYS, side_key, canonical_key
+
+# square (row, col) is stored in bit row * 8 + col of a 64-bit integer mask
+FULL_MASK = (1 << 64) - 1
+
+COL_FIRST_MASK = sum(1 << (row * 8) for row in range(BOARD_INITIAL_SIZE))
+COL_LAST_MASK = COL_FIRST_MASK << 7
+NOT_COL_FIRST_MASK = FULL_MASK ^ COL_FIRST_MASK
+NOT_COL_LAST_MASK = FULL_MASK ^ COL_LAST_MASK
+
+# coordinates of every bit, so we don't divide while decoding masks
+SQUARE_COORD = [(sq >> 3, sq & 7) for sq in range(64)]
+
+# rows each color may place on during the placing phase
+WHITE_ZONE_MASK = (1 << (8 * (BOARD_INITIAL_SIZE - 2))) - 1
+BLACK_ZONE_MASK = FULL_MASK ^ ((1 << 16) - 1)
+
+
+def square_mask(row, col):
+    return 1 << (row * 8 + col)
+
+
+def _region_mask(row_start, row_end, col_start, col_end):
+    """
+    :return: mask of all the squares with row_start <= row <= row_end and col_start <= col <= col_end
+    """
+    mask = 0
+    for row in range(row_start, row_end + 1):
+        for col in range(col_start, col_end + 1):
+            mask |= square_mask(row, col)
+    return mask
+
+
+# shift a whole mask one square in a direction, dropping bits that fall off the board
+def shift_left(mask):
+    return (mask >> 1) & NOT_COL_LAST_MASK
+
+
+def shift_up(mask):
+    return mask >> 8
+
+
+def shift_right(mask):
+    return (mask << 1) & NOT_COL_FIRST_MASK & FULL_MASK
+
+
+def shift_down(mask):
+    return (mask << 8) & FULL_MASK
+
+
+# same order of directions as BoardState.get_available_moves (left, up, right, down)
+SHIFTS = (shift_left, shift_up, shift_right, shift_down)
+SQUARE_DELTAS = (-1, -8, 1, 8)
+
+# per shrink level: playable squares and corners
+VALID_MASKS = []
+CORNER_MASKS = []
+# corners in the same order the referee places them when shrinking
+CORNER_SQUARES = []
+
+for _s in range(3):
+    _start, _end = _s, BOARD_INITIAL_SIZE - _s
+    VALID_MASKS.append(_region_mask(_start, _end - 1, _start, _end - 1))
+    CORNER_SQUARES.append(((_start, _start), (_end - 1, _start), (_end - 1, _end - 1), (_start, _end - 1)))
+    CORNER_MASKS.append(sum(square_mask(row, col) for row, col in CORNER_SQUARES[_s]))
+
+
+# masks of the columns swapped by every step of flip_horizontal
+FLIP_MASK_1 = 0x5555555555555555
+FLIP_MASK_2 = 0x3333333333333333
+FLIP_MASK_4 = 0x0f0f0f0f0f0f0f0f
+
+
+def flip_horizontal(mask):
+    """
+    :return: the mask reflected left-right: the 8 bits of every row are reversed, by swapping
+    neighbouring columns, then pairs of columns, then halves of rows
+    """
+    mask = (mask >> 1) & FLIP_MASK_1 | (mask & FLIP_MASK_1) << 1
+    mask = (mask >> 2) & FLIP_MASK_2 | (mask & FLIP_MASK_2) << 2
+    return (mask >> 4) & FLIP_MASK_4 | (mask & FLIP_MASK_4) << 4
+
+
+def popcount(mask):
+    return bin(mask).count('1')
+
+
+def mask_to_squares(mask):
+    squares = []
+    while mask:
+        low = mask & -mask
+        squares.append(low.bit_length() - 1)
+        mask ^= low
+    return squares
+
+
+def mask_to_coords(mask):
+    coords = []
+    while mask:
+        low = mask & -mask
+        coords.append(SQUARE_COORD[low.bit_length() - 1])
+        mask ^= low
+    return coords
+
+
+class BitBoardState:
+    """
+    Same public API as BoardState, but the board is kept as 64-bit integer masks
+    (one bit per square) so move generation, captures and shrinking are done with
+    shifts and masks instead of scanning lists of TileEnum.
+    Captures and shrinking follow the referee rules exactly.
+    """
+    __slots__ = ('_white', '_black', '_n_shrinks', '_corners', '_is_place_phase', '_undo_stack', '_hash',
+                 '_white_count', '_black_count', '_white_rank', '_black_rank')
+
+    def __init__(self):
+        self._white = 0
+        self._black = 0
+        self._n_shrinks = 0
+        self._corners = CORNER_MASKS[0]
+        self._is_place_phase = True
+
+        # undo records of the moves applied with make_move, newest last
+        self._undo_stack = []
+
+        # Zobrist hash of the pieces, phase and shrink level, updated with every change
+        self._hash = PLACE_PHASE_KEY ^ SHRINK_KEYS[0]
+
+        # evaluation terms of each color, updated with every change so a leaf is evaluated in O(1)
+        self._white_count = 0
+        self._black_count = 0
+        self._white_rank = 0
+        self._black_rank = 0
+
+    def get_white_loc(self):
+        return mask_to_coords(self._white)
+
+    def get_black_loc(self):
+        return mask_to_coords(self._black)
+
+    def get_pieces_mask(self, color):
+        if color == 'white':
+            return self._white
+        return self._black
+
+    def get_hash(self, color):
+        """
+        :param color: the color to play
+        :return: Zobrist hash of the state with color to play
+        """
+        return self._hash ^ side_key(color)
+
+    def get_canonical_hash(self, color):
+        """
+        :return: the hash of the state or of its mirror image, the same for both (see Zobrist.canonical_key),
+        and True iff it is the hash of the mirror image. the hash of the state itself when the two may
+        play out differently (see is_mirror_invariant)
+        """
+        key = self._hash ^ side_key(color)
+        if not self.is_mirror_invariant():
+            return key, False
+        return canonical_key(key)
+
+    def is_mirror_invariant(self):
+        """
+        :return: True iff the game goes on from the state like it does from its mirror image. the referee
+        places the corners of the second shrink one after the other, so on the board shrunk once a state
+        and its mirror image may lose different pieces to it
+        """
+        return self._is_place_phase or self._n_shrinks != 1
+
+    def is_symmetric(self):
+        """
+        :return: True iff the board is its own mirror image
+        """
+        return flip_horizontal(self._white) == self._white and flip_horizontal(self._black) == self._black
+
+    def _compute_hash(self):
+        board_hash = SHRINK_KEYS[self._n_shrinks]
+        if self._is_place_phase:
+            board_hash ^= PLACE_PHASE_KEY
+        for row, col in mask_to_coords(self._white):
+            board_hash ^= PIECE_KEYS['white'][row * 8 + col]
+        for row, col in mask_to_coords(self._black):
+            board_hash ^= PIECE_KEYS['black'][row * 8 + col]
+        return board_hash
+
+    def rank_pieces_loc(self, color):
+        """
+        :return: sum of the square ranks (see BoardState.square_rank) of the pieces of color,
+        kept as a running counter
+        """
+        if color == 'white':
+            return self._white_rank
+        return self._black_rank
+
+    def get_pieces_count(self, color):
+        if color == 'white':
+            return self._white_count
+        return self._black_count
+
+    def _update_pieces_terms(self, color, sq, sign):
+        # a piece of color is added (sign 1) or removed (sign -1) from square sq
+        if color == 'white':
+            self._white_count += sign
+            self._white_rank += sign * SQUARE_RANKS[self._n_shrinks][sq]
+        else:
+            self._black_count += sign
+            self._black_rank += sign * SQUARE_RANKS[self._n_shrinks][sq]
+
+    def _compute_pieces_terms(self):
+        ranks = SQUARE_RANKS[self._n_shrinks]
+        self._white_count = popcount(self._white)
+        self._black_count = popcount(self._black)
+        self._white_rank = sum(ranks[row * 8 + col] for row, col in mask_to_coords(self._white))
+        self._black_rank = sum(ranks[row * 8 + col] for row, col in mask_to_coords(self._black))
+
+    def check_shrink_board(self, turns):
+        """
+        shrink the board as many times as the referee has after turns of the moving phase.
+        safe to call more than once for the same turns
+        """
+        if self._is_place_phase:
+            return
+        while self._n_shrinks < shrink_level(turns):
+            self.shrink_board()
+
+    def get_shrink_level(self):
+        """
+        :return: number of times the board has shrunk
+        """
+        return self._n_shrinks
+
+    def check_update_phase(self, turns):
+        if turns == SUM_TURNS_PLACE_PHASE - 1 or turns == SUM_TURNS_PLACE_PHASE - 2:
+            self._end_place_phase()
+
+    def _end_place_phase(self):
+        if self._is_place_phase:
+            self._is_place_phase = False
+            self._hash ^= PLACE_PHASE_KEY
+
+    def get_is_place_phase(self):
+        return self._is_place_phase
+
+    def get_opposite_color(self, color):
+        if color == 'white':
+            return 'black'
+        return 'white'
+
+    def make_move(self, color, move, turns):
+        """
+        apply an action in place and push an undo record, so the search can walk one board
+        instead of copying it for every successor.
+        The undo record is the previous masks, which hold the moved piece, the captured pieces
+        and the previous phase and shrink state all at once.
+        :param color: color of the player doing the action
+        :param move: action of the search, in squares (see BoardState.move_to_referee)
+        :param turns: turns of the action, used to update the phase and shrink the board for the next turn
+        """
+        self._undo_stack.append((self._white, self._black, self._corners, self._n_shrinks,
+                                 self._is_place_phase, self._hash, self._white_count, self._black_count,
+                                 self._white_rank, self._black_rank))
+        if move is None:
+            # the player had no move and forfeited the turn
+            pass
+        elif self._is_place_phase:
+            self._place_square(color, move)
+        else:
+            self._remove_square(color, move[0])
+            self._place_square(color, move[1])
+
+        if turns == SUM_TURNS_PLACE_PHASE - 1:
+            self._end_place_phase()
+        self.check_shrink_board(turns + 1)
+
+    def unmake_move(self):
+        """
+        take back the last action applied with make_move
+        """
+        self._white, self._black, self._corners, self._n_shrinks, self._is_place_phase, self._hash, \
+            self._white_count, self._black_count, self._white_rank, self._black_rank = self._undo_stack.pop()
+
+    def get_made_moves(self):
+        """
+        :return: number of actions applied with make_move that were not taken back yet
+        """
+        return len(self._undo_stack)
+
+    def move_piece(self, color, source_row, source_col, dest_row, dest_col):
+        """
+        :return: list of (color, coord) of the pieces captured by the move
+        """
+        # remove the piece from his source tile
+        self.remove_piece(color, (source_row, source_col))
+        # place the piece on his dest tile
+        return self.place_piece(color, (dest_row, dest_col))
+
+    def place_piece(self, color, coord):
+        """
+        :return: list of (color, coord) of the pieces captured by the placement
+        """
+        # the masks with the piece placed, before the eliminations
+        white, black = self._white, self._black
+        if color == 'white':
+            white |= square_mask(coord[0], coord[1])
+        else:
+            black |= square_mask(coord[0], coord[1])
+        self._place_square(color, coord[0] * 8 + coord[1])
+
+        captured = []
+        if white != self._white:
+            captured += [('white', coord) for coord in mask_to_coords(white ^ self._white)]
+        if black != self._black:
+            captured += [('black', coord) for coord in mask_to_coords(black ^ self._black)]
+        return captured
+
+    def _place_square(self, color, sq):
+        bit = 1 << sq
+        self._hash ^= PIECE_KEYS[color][sq]
+        self._update_pieces_terms(color, sq, 1)
+        if color == 'white':
+            self._white |= bit
+        else:
+            self._black |= bit
+        self._eliminate_about(bit, color)
+
+    def remove_piece(self, color, coord):
+        self._remove_square(color, coord[0] * 8 + coord[1])
+
+    def _remove_square(self, color, sq):
+        bit = 1 << sq
+        self._hash ^= PIECE_KEYS[color][sq]
+        self._update_pieces_terms(color, sq, -1)
+        if color == 'white':
+            self._white &= ~bit
+        else:
+            self._black &= ~bit
+
+    def get_empty_tiles(self, color):
+        if color == 'white':
+            zone = WHITE_ZONE_MASK
+        else:
+            zone = BLACK_ZONE_MASK
+        return mask_to_coords(self._get_empty_mask() & zone)
+
+    def get_available_moves(self, color):
+        return [(SQUARE_COORD[source], SQUARE_COORD[dest]) for source, dest in self._generate_moves(color)]
+
+    def get_actions(self, color):
+        """
+        :return: the actions of color as the search keeps them, in squares (see BoardState.move_to_referee):
+        the empty squares of its zone in the placing phase, its moves otherwise
+        """
+        if self._is_place_phase:
+            if color == 'white':
+                return mask_to_squares(self._get_empty_mask() & WHITE_ZONE_MASK)
+            return mask_to_squares(self._get_empty_mask() & BLACK_ZONE_MASK)
+        return self._generate_moves(color)
+
+    def _generate_moves(self, color):
+        """
+        :return: the (source square, destination square) moves of color
+        """
+        pieces = self.get_pieces_mask(color)
+        occupied = self._white | self._black
+        empty = self._get_empty_mask()
+
+        available_moves = []
+        for shift, delta in zip(SHIFTS, SQUARE_DELTAS):
+            # step onto an adjacent empty square, or jump over an adjacent piece
+            steps = shift(pieces)
+            jumps = shift(steps & occupied) & empty
+            steps &= empty
+
+            while steps:
+                low = steps & -steps
+                dest = low.bit_length() - 1
+                available_moves.append((dest - delta, dest))
+                steps ^= low
+            while jumps:
+                low = jumps & -jumps
+                dest = low.bit_length() - 1
+                available_moves.append((dest - 2 * delta, dest))
+                jumps ^= low
+        return available_moves
+
+    def is_capture(self, color, move):
+        """
+        :param move: action of the search, in squares
+        :return: True iff the action of color would eliminate at least one enemy piece
+        """
+        if move is None:
+            return False
+        if self._is_place_phase:
+            source_bit, bit = 0, 1 << move
+        else:
+            source_bit, bit = 1 << move[0], 1 << move[1]
+
+        if color == 'white':
+            own, enemy = self._white, self._black
+        else:
+            own, enemy = self._black, self._white
+        allies = (own ^ source_bit) | self._corners
+
+        for shift in SHIFTS:
+            target = shift(bit) & enemy
+            if target and shift(target) & allies:
+                return True
+        return False
+
+    def get_capture_moves(self, color, moves):
+        """
+        :param moves: actions of color on the current board
+        :return: the actions in moves that would eliminate at least one enemy piece
+        """
+        if color == 'white':
+            own, enemy = self._white, self._black
+        else:
+            own, enemy = self._black, self._white
+        targets = self._capture_targets(own, enemy)
+        if not targets:
+            return []
+
+        capture_moves = []
+        for move in moves:
+            if move is None:
+                continue
+            dest = move if self._is_place_phase else move[1]
+            # a moving piece can't be its own ally, so candidates are confirmed one by one
+            if targets >> dest & 1 and self.is_capture(color, move):
+                capture_moves.append(move)
+        return capture_moves
+
+    def generate_capture_moves(self, color):
+        """
+        like get_capture_moves of all the actions of color, but only the actions that land next to
+        an enemy piece with an ally on its other side are generated
+        :return: the actions of color that would eliminate at least one enemy piece
+        """
+        if color == 'white':
+            own, enemy, zone = self._white, self._black, WHITE_ZONE_MASK
+        else:
+            own, enemy, zone = self._black, self._white, BLACK_ZONE_MASK
+        empty = self._get_empty_mask()
+        targets = self._capture_targets(own, enemy) & empty
+        if not targets:
+            return []
+        if self._is_place_phase:
+            # a placed piece can't be its own ally, every placement on a target captures
+            return mask_to_squares(targets & zone)
+
+        occupied = self._white | self._black
+        candidates = []
+        for shift, delta in zip(SHIFTS, SQUARE_DELTAS):
+            steps = shift(own)
+            jumps = shift(steps & occupied) & targets
+            steps &= targets
+            while steps:
+                low = steps & -steps
+                dest = low.bit_length() - 1
+                candidates.append((dest - delta, dest))
+                steps ^= low
+            while jumps:
+                low = jumps & -jumps
+                dest = low.bit_length() - 1
+                candidates.append((dest - 2 * delta, dest))
+                jumps ^= low
+        return [move for move in candidates if self.is_capture(color, move)]
+
+    def _capture_targets(self, own, enemy):
+        # squares next to an enemy piece that has an ally on its other side
+        allies = own | self._corners
+        return shift_right(enemy & shift_right(allies)) | shift_left(enemy & shift_left(allies)) | \
+            shift_down(enemy & shift_down(allies)) | shift_up(enemy & shift_up(allies))
+
+    def get_threatened_pieces(self, color):
+        """
+        :return: mask of the squares of the pieces of color the opponent could eliminate with its next action
+        """
+        if color == 'white':
+            own, enemy, enemy_color = self._white, self._black, 'black'
+        else:
+            own, enemy, enemy_color = self._black, self._white, 'white'
+
+        # only a piece with a hostile square on one side and an empty square on the other can be surrounded
+        hostile = enemy | self._corners
+        empty = self._get_empty_mask()
+        exposed = own & ((shift_right(hostile) & shift_left(empty)) | (shift_left(hostile) & shift_right(empty)) |
+                         (shift_down(hostile) & shift_up(empty)) | (shift_up(hostile) & shift_down(empty)))
+        if not exposed:
+            return 0
+
+        threatened = 0
+        for move in self.generate_capture_moves(enemy_color):
+            if self._is_place_phase:
+                source_bit, bit = 0, 1 << move
+            else:
+                source_bit, bit = 1 << move[0], 1 << move[1]
+            allies = (enemy ^ source_bit) | self._corners
+            for shift in SHIFTS:
+                target = shift(bit) & exposed
+                if target and shift(target) & allies:
+                    threatened |= target
+        return threatened
+
+    def shrink_board(self):
+        if self._n_shrinks >= 2:
+            return
+        self._n_shrinks += 1
+        valid = VALID_MASKS[self._n_shrinks]
+
+        # remove pieces on the outermost layer
+        self._white &= valid
+        self._black &= valid
+
+        # replace the corners (and perform corner elimination)
+        self._corners = 0
+        for row, col in CORNER_SQUARES[self._n_shrinks]:
+            bit = square_mask(row, col)
+            self._white &= ~bit
+            self._black &= ~bit
+            self._corners |= bit
+            self._eliminate_about_corner(bit)
+        self._hash = self._compute_hash()
+        self._compute_pieces_terms()
+
+    def print_board(self):
+        valid = VALID_MASKS[self._n_shrinks]
+        for row in range(BOARD_INITIAL_SIZE):
+            line = ''
+            for col in range(BOARD_INITIAL_SIZE):
+                bit = square_mask(row, col)
+                if self._black & bit:
+                    line += '@ '
+                elif self._white & bit:
+                    line += 'O '
+                elif self._corners & bit:
+                    line += 'X '
+                elif valid & bit:
+                    line += '- '
+                else:
+                    line += '  '
+            print(line)
+
+    def _get_empty_mask(self):
+        return VALID_MASKS[self._n_shrinks] & ~(self._white | self._black | self._corners)
+
+    def _eliminate_about(self, bit, color):
+        """
+        A piece of color has entered the square of bit: eliminate the adjacent enemy pieces
+        it surrounds, then possibly eliminate this piece too (like the referee's _eliminate_about).
+        """
+        if color == 'white':
+            own, enemy = self._white, self._black
+            enemy_color = 'black'
+        else:
+            own, enemy = self._black, self._white
+            enemy_color = 'white'
+
+        allies = own | self._corners
+        for shift in SHIFTS:
+            target = shift(bit) & enemy
+            if target and shift(target) & allies:
+                enemy ^= target
+                sq = target.bit_length() - 1
+                self._hash ^= PIECE_KEYS[enemy_color][sq]
+                self._update_pieces_terms(enemy_color, sq, -1)
+
+        hostile = enemy | self._corners
+        if (shift_left(bit) & hostile and shift_right(bit) & hostile) or \
+                (shift_up(bit) & hostile and shift_down(bit) & hostile):
+            own ^= bit
+            sq = bit.bit_length() - 1
+            self._hash ^= PIECE_KEYS[color][sq]
+            self._update_pieces_terms(color, sq, -1)
+
+        if color == 'white':
+            self._white, self._black = own, enemy
+        else:
+            self._black, self._white = own, enemy
+
+    def _eliminate_about_corner(self, bit):
+        """
+        A corner has been placed on the square of bit: eliminate the adjacent pieces
+        it surrounds together with an enemy piece or another corner.
+        """
+        for shift in SHIFTS:
+            target = shift(bit)
+            if target & self._white:
+                if shift(target) & (self._black | self._corners):
+                    self._white ^= target
+            elif target & self._black:
+                if shift(target) & (self._white | self._corners):
+                    self._black ^= target
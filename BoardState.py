@@ -1,5 +1,6 @@
 
 from TileEnum import TileEnum
+from Zobrist import PIECE_KEYS, PLACE_PHASE_KEY, SHRINK_KEYS, side_key, canonical_key
 
 
 BOARD_INITIAL_SIZE = 8
@@ -7,7 +8,163 @@ SUM_TURNS_PLACE_PHASE = 24
 FIRST_BOARD_SHRINK = 128
 SECOND_BOARD_SHRINK = 192
 
+
+def shrink_level(turns):
+    """
+    :param turns: turns of the moving phase played so far
+    :return: number of times the referee has shrunk the board after these turns
+    """
+    if turns >= SECOND_BOARD_SHRINK:
+        return 2
+    if turns >= FIRST_BOARD_SHRINK:
+        return 1
+    return 0
+
+
+def mirror_coord(coord):
+    """
+    :return: the square of coord reflected left-right
+    """
+    return coord[0], BOARD_INITIAL_SIZE - 1 - coord[1]
+
+
+def square_to_coord(square):
+    """
+    :return: the (row, col) of square row * 8 + col
+    """
+    return square >> 3, square & 7
+
+
+def coord_to_square(coord):
+    return coord[0] * 8 + coord[1]
+
+
+# The search keeps an action as squares (row * 8 + col): the square of a placement, the (source square,
+# destination square) of a move, or None when the player has no move and forfeits the turn. The actions
+# are converted to the referee's (x, y) coordinates only when they are played or received.
+
+def move_to_referee(move):
+    """
+    :return: the action move of the search in the referee's format, (x, y) or ((xa, ya), (xb, yb))
+    """
+    if move is None:
+        return None
+    if isinstance(move, tuple):
+        return (move[0] & 7, move[0] >> 3), (move[1] & 7, move[1] >> 3)
+    return move & 7, move >> 3
+
+
+def referee_to_move(action):
+    """
+    :return: the action of the referee's format as an action of the search
+    """
+    if action is None:
+        return None
+    if isinstance(action[0], tuple):
+        (xa, ya), (xb, yb) = action
+        return ya * 8 + xa, yb * 8 + xb
+    return action[1] * 8 + action[0]
+
+
+def move_to_coords(move):
+    """
+    :return: the action move of the search as (row, col) placement or ((row, col), (row, col)) move
+    """
+    if move is None:
+        return None
+    if isinstance(move, tuple):
+        return square_to_coord(move[0]), square_to_coord(move[1])
+    return square_to_coord(move)
+
+
+def mirror_move(move):
+    """
+    :param move: action of the search
+    :return: the action reflected left-right, column col of a square becomes column 7 - col
+    """
+    if move is None:
+        return None
+    if isinstance(move, tuple):
+        return move[0] ^ 7, move[1] ^ 7
+    return move ^ 7
+
+
+def square_rank(row, col, board_start, board_end):
+    """
+    how good a square is for a piece: pieces in the center get 3 points, pieces on the edge
+    lose 3 points and pieces next to the edge lose 1 point
+    """
+    center = (board_end - board_start) / 2
+    center_start = center - 1
+    center_end = center + 1
+
+    rank = 0
+    if row >= center_start and row <= center_end and col >= center_start and col <= center_end:
+        rank += 3
+    if row == board_start or col == board_start or row == board_end - 1 or col == board_end - 1:
+        rank -= 3
+    if row == board_start + 1 or col == board_start + 1 or row == board_end - 2 or col == board_end - 2:
+        rank -= 1
+    return rank
+
+
+# SQUARE_RANKS[number of shrinks][row * 8 + col]
+SQUARE_RANKS = [[square_rank(sq // 8, sq % 8, s, BOARD_INITIAL_SIZE - s) for sq in range(64)] for s in range(3)]
+
+# (row step, col step) of the directions, in the order the moves are generated
+LEFT, UP, RIGHT, DOWN = 0, 1, 2, 3
+DIRECTIONS = ((0, -1), (-1, 0), (0, 1), (1, 0))
+
+
+def _build_move_table(board_start, board_end):
+    """
+    :return: table indexed by row * 8 + col of a list of 4 entries, one per direction: None when the
+    adjacent square is off the board, otherwise (adjacent square, square after it) where the square after
+    the adjacent square (the target of a jump) is None when it is off the board
+    """
+    def on_board(row, col):
+        return board_start <= row < board_end and board_start <= col < board_end
+
+    table = []
+    for sq in range(BOARD_INITIAL_SIZE * BOARD_INITIAL_SIZE):
+        row, col = sq // 8, sq % 8
+        entries = []
+        for row_step, col_step in DIRECTIONS:
+            step = (row + row_step, col + col_step)
+            jump = (row + 2 * row_step, col + 2 * col_step)
+            if not on_board(*step):
+                entries.append(None)
+            elif not on_board(*jump):
+                entries.append((step, None))
+            else:
+                entries.append((step, jump))
+        table.append(entries)
+    return table
+
+
+def _build_capture_table(move_table):
+    """
+    :return: table indexed by row * 8 + col of the (square, square) pairs on opposite sides of the square
+    (left and right, up and down) that surround a piece on it when both are hostile
+    """
+    table = []
+    for entries in move_table:
+        pairs = []
+        for first, second in ((LEFT, RIGHT), (UP, DOWN)):
+            if entries[first] is not None and entries[second] is not None:
+                pairs.append((entries[first][0], entries[second][0]))
+        table.append(pairs)
+    return table
+
+
+# built once for each board size (8x8, 6x6, 4x4), indexed by the number of shrinks
+MOVE_TABLES = [_build_move_table(s, BOARD_INITIAL_SIZE - s) for s in range(3)]
+CAPTURE_TABLES = [_build_capture_table(table) for table in MOVE_TABLES]
+
 class BoardState:
+    __slots__ = ('_board', '_is_place_phase', '_white_loc', '_black_loc', '_corner_loc', '_board_end',
+                 '_board_start', '_undo_stack', '_hash', '_rank')
+
     def __init__(self):
 
         # list of lists representing the board. Hold Tile objects
@@ -19,6 +176,15 @@ class BoardState:
         self._board_end = BOARD_INITIAL_SIZE
         self._board_start = BOARD_INITIAL_SIZE - self._board_end
 
+        # undo records of the moves applied with make_move, newest last
+        self._undo_stack = []
+
+        # Zobrist hash of the pieces, phase and shrink level, updated with every change
+        self._hash = PLACE_PHASE_KEY ^ SHRINK_KEYS[0]
+
+        # evaluation terms of each color, updated with every change so a leaf is evaluated in O(1)
+        self._rank = {'white': 0, 'black': 0}
+
         # initialize the board with empty tiles and corner tiles
         for row in range(self._board_end):
             row_list = []
@@ -35,39 +201,82 @@ class BoardState:
     def get_black_loc(self):
         return self._black_loc
 
-    def rank_pieces_loc(self, color):
-        center = (self._board_end - self._board_start) / 2
-        center_start = center - 1
-        center_end = center + 1
+    def get_hash(self, color):
+        """
+        :param color: the color to play
+        :return: Zobrist hash of the state with color to play
+        """
+        return self._hash ^ side_key(color)
 
-        if color == 'white':
-            list = self._white_loc
-        else:
-            list = self._black_loc
+    def get_canonical_hash(self, color):
+        """
+        :return: the hash of the state or of its mirror image, the same for both (see Zobrist.canonical_key),
+        and True iff it is the hash of the mirror image. the hash of the state itself when the two may
+        play out differently (see is_mirror_invariant)
+        """
+        key = self._hash ^ side_key(color)
+        if not self.is_mirror_invariant():
+            return key, False
+        return canonical_key(key)
 
-        pieces_in_center = 0
-        for p in list:
-            row, col = p[0], p[1]
-            if row >= center_start and row <= center_end and col >= center_start and col <= center_end:
-                pieces_in_center += 3
-            if row == self._board_start or col == self._board_start or row == self._board_end - 1 or \
-                    col == self._board_end - 1:
-                pieces_in_center -= 3
-            if row == self._board_start + 1 or col == self._board_start + 1 or row == self._board_end - 2 or col == self._board_end - 2:
-                pieces_in_center -= 1
-        return pieces_in_center
+    def is_mirror_invariant(self):
+        """
+        :return: True iff the game goes on from the state like it does from its mirror image. the referee
+        places the corners of the second shrink one after the other, so on the board shrunk once a state
+        and its mirror image may lose different pieces to it
+        """
+        return self._is_place_phase or self._board_start != 1
 
+    def is_symmetric(self):
+        """
+        :return: True iff the board is its own mirror image
+        """
+        return all(set(loc) == set(map(mirror_coord, loc)) for loc in (self._white_loc, self._black_loc))
+
+    def _compute_hash(self):
+        board_hash = SHRINK_KEYS[self._board_start]
+        if self._is_place_phase:
+            board_hash ^= PLACE_PHASE_KEY
+        for row, col in self._white_loc:
+            board_hash ^= PIECE_KEYS['white'][row * 8 + col]
+        for row, col in self._black_loc:
+            board_hash ^= PIECE_KEYS['black'][row * 8 + col]
+        return board_hash
 
-    def check_shrink_board(self, turns):
+    def rank_pieces_loc(self, color):
+        """
+        :return: sum of the square ranks (see square_rank) of the pieces of color, kept as a running counter
+        """
+        return self._rank[color]
+
+    def get_pieces_count(self, color):
+        if color == 'white':
+            return len(self._white_loc)
+        return len(self._black_loc)
 
-        if turns in (FIRST_BOARD_SHRINK, FIRST_BOARD_SHRINK - 1, SECOND_BOARD_SHRINK,
-                     SECOND_BOARD_SHRINK - 1):
+    def _compute_ranks(self):
+        ranks = SQUARE_RANKS[self._board_start]
+        return {'white': sum(ranks[row * 8 + col] for row, col in self._white_loc),
+                'black': sum(ranks[row * 8 + col] for row, col in self._black_loc)}
 
+    def check_shrink_board(self, turns):
+        """
+        shrink the board as many times as the referee has after turns of the moving phase.
+        safe to call more than once for the same turns
+        """
+        if self._is_place_phase:
+            return
+        while self._board_start < shrink_level(turns):
             self.shrink_board()
 
     def check_update_phase(self, turns):
         if turns == SUM_TURNS_PLACE_PHASE - 1 or turns == SUM_TURNS_PLACE_PHASE - 2:
+            self._end_place_phase()
+
+    def _end_place_phase(self):
+        if self._is_place_phase:
             self._is_place_phase = False
+            self._hash ^= PLACE_PHASE_KEY
 
     def get_is_place_phase(self):
         return self._is_place_phase
@@ -77,15 +286,97 @@ class BoardState:
             return 'black'
         return 'white'
 
+    def make_move(self, color, move, turns):
+        """
+        apply an action in place and push an undo record, so the search can walk one board
+        instead of copying it for every successor.
+        :param color: color of the player doing the action
+        :param move: action of the search (see move_to_referee)
+        :param turns: turns of the action, used to update the phase and shrink the board for the next turn
+        """
+        move = move_to_coords(move)
+        is_place_phase = self._is_place_phase
+        board_hash = self._hash
+        if move is None:
+            # the player had no move and forfeited the turn
+            captured = []
+        elif is_place_phase:
+            captured = self.place_piece(color, move)
+        else:
+            source, dest = move[0], move[1]
+            captured = self.move_piece(color, source[0], source[1], dest[0], dest[1])
+
+        if turns == SUM_TURNS_PLACE_PHASE - 1:
+            self._end_place_phase()
+
+        shrink_state = None
+        if not self._is_place_phase and self._board_start < shrink_level(turns + 1):
+            shrink_state = (self._board_start, self._board_end, [row[:] for row in self._board],
+                            self._white_loc[:], self._black_loc[:], self._corner_loc, dict(self._rank))
+            self.check_shrink_board(turns + 1)
+
+        self._undo_stack.append((color, move, captured, is_place_phase, shrink_state, board_hash))
+
+    def unmake_move(self):
+        """
+        take back the last action applied with make_move
+        """
+        color, move, captured, is_place_phase, shrink_state, board_hash = self._undo_stack.pop()
+
+        if shrink_state is not None:
+            self._board_start, self._board_end, self._board, self._white_loc, self._black_loc, self._corner_loc, \
+                self._rank = shrink_state
+
+        self._is_place_phase = is_place_phase
+
+        # put back the captured pieces (the moved piece itself may be one of them)
+        for captured_color, coord in reversed(captured):
+            self._put_piece(captured_color, coord)
+
+        if move is None:
+            pass
+        elif is_place_phase:
+            self.remove_piece(color, move)
+        else:
+            source, dest = move[0], move[1]
+            self.remove_piece(color, dest)
+            self._put_piece(color, source)
+        self._hash = board_hash
+
+    def get_made_moves(self):
+        """
+        :return: number of actions applied with make_move that were not taken back yet
+        """
+        return len(self._undo_stack)
+
     def move_piece(self, color, source_row, source_col, dest_row, dest_col):
+        """
+        :return: list of (color, coord) of the pieces captured by the move
+        """
         # remove the piece from his source tile
         self.remove_piece(color, (source_row, source_col))
         # place the piece on his dest tile
-        self.place_piece(color, (dest_row, dest_col))
+        return self.place_piece(color, (dest_row, dest_col))
+
+    def _put_piece(self, color, coord):
+        # put a piece on the board without resolving captures
+        self._hash ^= PIECE_KEYS[color][coord[0] * 8 + coord[1]]
+        self._rank[color] += SQUARE_RANKS[self._board_start][coord[0] * 8 + coord[1]]
+        if color == 'white':
+            self._white_loc.append(coord)
+            self._board[coord[0]][coord[1]] = TileEnum.WHITE_PIECE
+        else:
+            self._black_loc.append(coord)
+            self._board[coord[0]][coord[1]] = TileEnum.BLACK_PIECE
 
     def place_piece(self, color, coord):
+        """
+        :return: list of (color, coord) of the pieces captured by the placement
+        """
         coord_row = coord[0]
         coord_col = coord[1]
+        self._hash ^= PIECE_KEYS[color][coord_row * 8 + coord_col]
+        self._rank[color] += SQUARE_RANKS[self._board_start][coord_row * 8 + coord_col]
         if color == 'white':
             self._white_loc.append(coord)
             # update board we placed a piece
@@ -96,19 +387,48 @@ class BoardState:
             # update board we placed a piece
             self._board[coord_row][coord_col] = TileEnum.BLACK_PIECE
 
+        # remove pieces which are surrounded (first the opponent pieces)
+        return self._eliminate_about(color, coord)
+
+    def _eliminate_about(self, color, coord):
+        """
+        A piece of color has entered coord: eliminate the adjacent enemy pieces it surrounds,
+        then possibly eliminate this piece too (like the referee's _eliminate_about).
+        Only the squares next to coord can change, so the other pieces are not looked at.
+        :return: list of (color, coord) of the removed pieces
+        """
         if color == 'white':
-            opponent_color = 'black'
+            own_enum, enemy_enum = TileEnum.WHITE_PIECE, TileEnum.BLACK_PIECE
+            enemy_color = 'black'
         else:
-            opponent_color = 'white'
-
-        # remove pieces which are surrounded (first the opponent pieces)
-        self.remove_surrounded_piece(opponent_color)
-        self.remove_surrounded_piece(color)
+            own_enum, enemy_enum = TileEnum.BLACK_PIECE, TileEnum.WHITE_PIECE
+            enemy_color = 'white'
+
+        board = self._board
+        removed = []
+        for entry in MOVE_TABLES[self._board_start][coord[0] * 8 + coord[1]]:
+            if entry is None or entry[1] is None:
+                continue
+            target, beyond = entry
+            if board[target[0]][target[1]] is enemy_enum and \
+                    board[beyond[0]][beyond[1]] in (own_enum, TileEnum.CORNER_TILE):
+                self.remove_piece(enemy_color, target)
+                removed.append((enemy_color, target))
+
+        hostile = (enemy_enum, TileEnum.CORNER_TILE)
+        for first, second in CAPTURE_TABLES[self._board_start][coord[0] * 8 + coord[1]]:
+            if board[first[0]][first[1]] in hostile and board[second[0]][second[1]] in hostile:
+                self.remove_piece(color, coord)
+                removed.append((color, coord))
+                break
+        return removed
 
     def remove_piece(self, color, coord):
         coord_row = coord[0]
         coord_col = coord[1]
         self._board[coord_row][coord_col] = TileEnum.EMPTY_TILE
+        self._hash ^= PIECE_KEYS[color][coord_row * 8 + coord_col]
+        self._rank[color] -= SQUARE_RANKS[self._board_start][coord_row * 8 + coord_col]
 
         if color == 'white':
             self._white_loc.remove(coord)
@@ -138,42 +458,142 @@ class BoardState:
         else:
             loc_list = self._black_loc
 
+        board = self._board
+        move_table = MOVE_TABLES[self._board_start]
         for piece in loc_list:
-            row = piece[0]
-            col = piece[1]
+            for entry in move_table[piece[0] * 8 + piece[1]]:
+                if entry is None:
+                    continue
+                step, jump = entry
+                tile = board[step[0]][step[1]]
+                if tile is TileEnum.EMPTY_TILE:
+                    available_moves.append((piece, step))
+                elif tile is not TileEnum.CORNER_TILE and jump is not None and \
+                        board[jump[0]][jump[1]] is TileEnum.EMPTY_TILE:
+                    available_moves.append((piece, jump))
+        return available_moves
 
-            left_move = self.check_left_move(row, col)
-            if left_move is not None:
-                available_moves.append(left_move)
+    def get_actions(self, color):
+        """
+        :return: the actions of color as the search keeps them (see move_to_referee): the empty squares of
+        its zone in the placing phase, its moves otherwise
+        """
+        if self._is_place_phase:
+            return [coord_to_square(coord) for coord in self.get_empty_tiles(color)]
+        return [(coord_to_square(source), coord_to_square(dest)) for source, dest in self.get_available_moves(color)]
 
-            up_move = self.check_up_move(row, col)
-            if up_move is not None:
-                available_moves.append(up_move)
+    def is_capture(self, color, move):
+        """
+        :param move: action of the search (see move_to_referee)
+        :return: True iff the action of color would eliminate at least one enemy piece
+        """
+        if move is None:
+            return False
+        if self._is_place_phase:
+            source, dest = None, square_to_coord(move)
+        else:
+            source, dest = square_to_coord(move[0]), square_to_coord(move[1])
 
-            right_move = self.check_right_move(row, col)
-            if right_move is not None:
-                available_moves.append(right_move)
+        if color == 'white':
+            own_enum, enemy_enum = TileEnum.WHITE_PIECE, TileEnum.BLACK_PIECE
+        else:
+            own_enum, enemy_enum = TileEnum.BLACK_PIECE, TileEnum.WHITE_PIECE
+
+        board = self._board
+        for entry in MOVE_TABLES[self._board_start][dest[0] * 8 + dest[1]]:
+            if entry is None or entry[1] is None:
+                continue
+            (row, col), beyond = entry
+            if board[row][col] is enemy_enum and beyond != source and \
+                    board[beyond[0]][beyond[1]] in (own_enum, TileEnum.CORNER_TILE):
+                return True
+        return False
+
+    def get_capture_moves(self, color, moves):
+        """
+        :param moves: actions of color on the current board
+        :return: the actions in moves that would eliminate at least one enemy piece
+        """
+        return [move for move in moves if self.is_capture(color, move)]
 
-            down_move = self.check_down_move(row, col)
-            if down_move is not None:
-                available_moves.append(down_move)
-        return available_moves
+    def generate_capture_moves(self, color):
+        """
+        :return: the actions of color that would eliminate at least one enemy piece
+        """
+        return self.get_capture_moves(color, self.get_actions(color))
 
-    def shrink_board(self):
-        self._board_end = BOARD_INITIAL_SIZE - 1
-        self._board_start = BOARD_INITIAL_SIZE - self._board_end
+    def get_threatened_pieces(self, color):
+        """
+        :return: mask of the squares (bit row * 8 + col) of the pieces of color the opponent could eliminate
+        with its next action
+        """
+        if color == 'white':
+            own_enum, enemy_enum, enemy_color = TileEnum.WHITE_PIECE, TileEnum.BLACK_PIECE, 'black'
+        else:
+            own_enum, enemy_enum, enemy_color = TileEnum.BLACK_PIECE, TileEnum.WHITE_PIECE, 'white'
 
-        # update the board with the new corners
-        self._board[self._board_start][self._board_start] = TileEnum.CORNER_TILE
-        self._board[self._board_end - 1][self._board_end - 1] = TileEnum.CORNER_TILE
-        self._board[self._board_start][self._board_end - 1] = TileEnum.CORNER_TILE
-        self._board[self._board_end - 1][self._board_start] = TileEnum.CORNER_TILE
+        board = self._board
+        threatened = 0
+        for move in self.generate_capture_moves(enemy_color):
+            if self._is_place_phase:
+                source, dest = None, square_to_coord(move)
+            else:
+                source, dest = square_to_coord(move[0]), square_to_coord(move[1])
+            for entry in MOVE_TABLES[self._board_start][dest[0] * 8 + dest[1]]:
+                if entry is None or entry[1] is None:
+                    continue
+                (row, col), beyond = entry
+                if board[row][col] is own_enum and beyond != source and \
+                        board[beyond[0]][beyond[1]] in (enemy_enum, TileEnum.CORNER_TILE):
+                    threatened |= 1 << (row * 8 + col)
+        return threatened
 
-        # remove from black_loc and white_loc lists pieces from old board locations
+    def shrink_board(self):
+        """
+        remove the outermost layer of the board with the pieces on it, and place the new corners,
+        which eliminate the pieces they surround (like the referee's _shrink_board)
+        """
+        for i in range(self._board_start, self._board_end):
+            for row, col in ((i, self._board_start), (self._board_start, i), (i, self._board_end - 1),
+                             (self._board_end - 1, i)):
+                self._board[row][col] = TileEnum.EMPTY_TILE
+        self._board_start += 1
+        self._board_end -= 1
 
+        # remove from black_loc and white_loc lists pieces from old board locations
         self.remove_pieces_old_board_loc('white')
         self.remove_pieces_old_board_loc('black')
 
+        # update the board with the new corners, in the order the referee places them
+        start, last = self._board_start, self._board_end - 1
+        self._corner_loc = [(start, start), (last, start), (last, last), (start, last)]
+        for coord in self._corner_loc:
+            if coord in self._white_loc:
+                self._white_loc.remove(coord)
+            elif coord in self._black_loc:
+                self._black_loc.remove(coord)
+            self._board[coord[0]][coord[1]] = TileEnum.CORNER_TILE
+            self._eliminate_about_corner(coord)
+
+        self._hash = self._compute_hash()
+        self._rank = self._compute_ranks()
+
+    def _eliminate_about_corner(self, coord):
+        """
+        A corner has been placed on coord: eliminate the adjacent pieces it surrounds
+        together with an enemy piece or another corner.
+        """
+        board = self._board
+        for entry in MOVE_TABLES[self._board_start][coord[0] * 8 + coord[1]]:
+            if entry is None or entry[1] is None:
+                continue
+            (row, col), beyond = entry
+            tile, beyond_tile = board[row][col], board[beyond[0]][beyond[1]]
+            if tile is TileEnum.WHITE_PIECE and beyond_tile in (TileEnum.BLACK_PIECE, TileEnum.CORNER_TILE):
+                self.remove_piece('white', (row, col))
+            elif tile is TileEnum.BLACK_PIECE and beyond_tile in (TileEnum.WHITE_PIECE, TileEnum.CORNER_TILE):
+                self.remove_piece('black', (row, col))
+
     def remove_pieces_old_board_loc(self, color):
         if color == 'white':
             list = self._white_loc
@@ -183,15 +603,10 @@ class BoardState:
         new_list = []
         for piece in list:
             # if piece not in the top row or bottom row or top col or bottom col
-            # and not where the new corners are going to be
             if not(piece[0] in (self._board_start - 1, self._board_end)
-                   or piece[1] in (self._board_start - 1, self._board_end))\
-                    and not ((piece[0], piece[1]) in ((self._board_start, self._board_start),
-                                                      (self._board_end - 1, self._board_end - 1),
-                                                      (self._board_start, self._board_end - 1),
-                                                      (self._board_end - 1, self._board_start))):
+                   or piece[1] in (self._board_start - 1, self._board_end)):
                 new_list.append(piece)
-        if list == self._white_loc:
+        if color == 'white':
             self._white_loc = new_list
         else:
             self._black_loc = new_list
@@ -200,7 +615,9 @@ class BoardState:
         for i in range(len(self._board)):
             row = ''
             for j in range(len(self._board)):
-                if self._board[i][j] == TileEnum.BLACK_PIECE:
+                if not (self._board_start <= i < self._board_end and self._board_start <= j < self._board_end):
+                    row += '  '
+                elif self._board[i][j] == TileEnum.BLACK_PIECE:
                     row += '@ '
                 elif self._board[i][j] == TileEnum.WHITE_PIECE:
                     row += 'O '
@@ -210,23 +627,17 @@ class BoardState:
                     row += 'X '
             print(row)
 
+    def get_shrink_level(self):
+        """
+        :return: number of times the board has shrunk
+        """
+        return self._board_start
+
     def check_left_move(self, row, col):
-        if col > self._board_start:
-            if self._board[row][col - 1] == TileEnum.EMPTY_TILE:
-                return (row, col), (row, col - 1)
-            elif self._board[row][col - 1] in (TileEnum.BLACK_PIECE, TileEnum.WHITE_PIECE):
-                if col - 1 > self._board_start:
-                    if self._board[row][col - 2] == TileEnum.EMPTY_TILE:
-                        return (row, col), (row, col - 2)
+        return self._check_move(row, col, LEFT)
 
     def check_up_move(self, row, col):
-        if row > self._board_start:
-            if self._board[row-1][col] == TileEnum.EMPTY_TILE:
-                return (row, col), (row - 1, col)
-            elif self._board[row - 1][col] in (TileEnum.BLACK_PIECE, TileEnum.WHITE_PIECE):
-                if row - 1 > self._board_start:
-                    if self._board[row - 2][col] == TileEnum.EMPTY_TILE:
-                        return (row, col), (row - 2, col)
+        return self._check_move(row, col, UP)
 
     def check_right_move(self, row, col):
         """
@@ -235,13 +646,7 @@ class BoardState:
         :param col: column of tile we are moving from
         :return: move
         """
-        if col < self._board_end - 1:
-            if self._board[row][col + 1] == TileEnum.EMPTY_TILE:
-                return (row, col), (row, col + 1)
-            elif self._board[row][col + 1] in (TileEnum.BLACK_PIECE, TileEnum.WHITE_PIECE):
-                if col + 1 < self._board_end - 1:
-                    if self._board[row][col + 2] == TileEnum.EMPTY_TILE:
-                        return (row, col), (row, col + 2)
+        return self._check_move(row, col, RIGHT)
 
     def check_down_move(self, row, col):
         """
@@ -250,43 +655,41 @@ class BoardState:
         :param col: column of tile we are moving from
         :return: move
         """
-        if row < self._board_end - 1:
-            if self._board[row + 1][col] == TileEnum.EMPTY_TILE:
-                return (row, col) , (row + 1, col)
-            elif self._board[row + 1][col] in (TileEnum.BLACK_PIECE, TileEnum.WHITE_PIECE):
-                if row + 1 < self._board_end - 1:
-                    if self._board[row + 2][col] == TileEnum.EMPTY_TILE:
-                        return (row, col), (row + 2, col)
+        return self._check_move(row, col, DOWN)
+
+    def _check_move(self, row, col, direction):
+        # step to the adjacent square if it is empty, or jump over it if it holds a piece
+        entry = MOVE_TABLES[self._board_start][row * 8 + col][direction]
+        if entry is None:
+            return None
+        step, jump = entry
+        tile = self._board[step[0]][step[1]]
+        if tile is TileEnum.EMPTY_TILE:
+            return (row, col), step
+        if tile is not TileEnum.CORNER_TILE and jump is not None and \
+                self._board[jump[0]][jump[1]] is TileEnum.EMPTY_TILE:
+            return (row, col), jump
+        return None
 
     def remove_surrounded_piece(self, color):
-
+        """
+        :return: list of (color, coord) of the removed pieces
+        """
+        removed = []
         if color == 'white':
-            opposite_color_enum = TileEnum.BLACK_PIECE
+            hostile = (TileEnum.BLACK_PIECE, TileEnum.CORNER_TILE)
             list = self._white_loc
         else:
-            opposite_color_enum = TileEnum.WHITE_PIECE
+            hostile = (TileEnum.WHITE_PIECE, TileEnum.CORNER_TILE)
             list = self._black_loc
 
-        for piece in list:
-            coord_row = piece[0]
-            coord_col = piece[1]
-
-            if coord_row == self._board_start or coord_row == self._board_end - 1:
-                if self._board[coord_row][coord_col - 1] \
-                        in (opposite_color_enum, TileEnum.CORNER_TILE) and \
-                        self._board[coord_row][coord_col + 1] \
-                        in (opposite_color_enum, TileEnum.CORNER_TILE):
-                            self.remove_piece(color, piece)
-
-            elif coord_col == self._board_start or coord_col == self._board_end - 1:
-                if self._board[coord_row - 1][coord_col] \
-                        in (opposite_color_enum, TileEnum.CORNER_TILE) and \
-                        self._board[coord_row + 1][coord_col] \
-                        in (opposite_color_enum, TileEnum.CORNER_TILE):
-                    self.remove_piece(color, piece)
-            else:
-                if (self._board[coord_row][coord_col - 1] == opposite_color_enum and \
-                    self._board[coord_row][coord_col + 1] == opposite_color_enum) \
-                        or (self._board[coord_row - 1][coord_col] == opposite_color_enum and \
-                            self._board[coord_row + 1][coord_col] == opposite_color_enum):
+        board = self._board
+        capture_table = CAPTURE_TABLES[self._board_start]
+        # iterate over a copy, removing a piece must not skip the next one
+        for piece in list[:]:
+            for first, second in capture_table[piece[0] * 8 + piece[1]]:
+                if board[first[0]][first[1]] in hostile and board[second[0]][second[1]] in hostile:
                     self.remove_piece(color, piece)
+                    removed.append((color, piece))
+                    break
+        return removed
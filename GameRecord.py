@@ -0,0 +1,230 @@
+import os
+import struct
+
+from referee import _Game
+
+# first bytes of the record of every game
+RECORD_MAGIC = b'WYBG'
+RECORD_VERSION = 1
+
+# magic, version, and the lengths of the names of the white and black players (then the names)
+RECORD_HEADER = struct.Struct('<4sBBB')
+
+# every action is 2 bytes: source square and destination square, as x + 8 * y.
+# a placement has no source, a forfeit has no destination
+ACTION = struct.Struct('<BB')
+NO_SQUARE = 64
+
+# after the actions: END_OF_GAME then the result (winner code | reason the game ended)
+END_OF_GAME = 255
+WINNER_CODES = {None: 0, 'W': 1, 'B': 2, 'draw': 3}
+WINNERS = {code: winner for winner, code in WINNER_CODES.items()}
+WINNER_MASK = 0x0f
+# reasons a game ended other than the rules: a player lost by an invalid action or by running out of time
+REASON_CODES = {None: 0, 'invalid': 0x10, 'time': 0x20}
+REASONS = {code: reason for reason, code in REASON_CODES.items()}
+
+# the index of a record file holds the offset of every complete game in it
+INDEX_SUFFIX = '.idx'
+OFFSET = struct.Struct('<Q')
+
+# bytes read at a time when looking for the next game record past a broken one
+SCAN_CHUNK_SIZE = 1 << 16
+
+# the longest name of a player, in bytes of UTF-8
+MAX_NAME_LENGTH = 255
+
+
+def encode_action(action):
+    """
+    :param action: action in the referee's format, (x, y), ((xa, ya), (xb, yb)) or None
+    :return: the 2 bytes of the action
+    """
+    if action is None:
+        return ACTION.pack(NO_SQUARE, NO_SQUARE)
+    if isinstance(action[0], tuple):
+        (xa, ya), (xb, yb) = action
+        return ACTION.pack(xa + 8 * ya, xb + 8 * yb)
+    x, y = action
+    return ACTION.pack(NO_SQUARE, x + 8 * y)
+
+
+def encode_name(name):
+    """
+    :return: the UTF-8 bytes of name, cut to MAX_NAME_LENGTH bytes without splitting a character
+    """
+    # a cut in the middle of a character leaves an incomplete sequence at the end, which is dropped
+    return name.encode()[:MAX_NAME_LENGTH].decode(errors='ignore').encode()
+
+
+def decode_action(source, dest):
+    if dest == NO_SQUARE:
+        return None
+    if source == NO_SQUARE:
+        return dest % 8, dest // 8
+    return (source % 8, source // 8), (dest % 8, dest // 8)
+
+
+class GameRecordWriter:
+    """
+    Appends games to a record file, one action at a time as they are played, so a game is
+    written even if it never finishes. The offset of every finished game is appended to the
+    index file next to it (path + INDEX_SUFFIX).
+    """
+    def __init__(self, path):
+        self._file = open(path, 'ab')
+        self._index = open(path + INDEX_SUFFIX, 'ab')
+        self._offset = None
+
+    def start_game(self, white, black):
+        """
+        :param white: name of the white player (like its module)
+        :param black: name of the black player
+        """
+        white, black = encode_name(white), encode_name(black)
+        self._offset = self._file.tell()
+        self._file.write(RECORD_HEADER.pack(RECORD_MAGIC, RECORD_VERSION, len(white), len(black)))
+        self._file.write(white + black)
+
+    def add_action(self, action):
+        self._file.write(encode_action(action))
+
+    def end_game(self, winner, reason=None):
+        """
+        :param winner: winner of the game, 'W', 'B', 'draw' or None
+        :param reason: 'invalid' or 'time' when a player lost by an invalid action or by running
+        out of time, otherwise None
+        """
+        self._file.write(ACTION.pack(END_OF_GAME, WINNER_CODES[winner] | REASON_CODES[reason]))
+        self._file.flush()
+        self._index.write(OFFSET.pack(self._offset))
+        self._index.flush()
+        self._offset = None
+
+    def close(self):
+        self._file.close()
+        self._index.close()
+
+
+class GameRecord:
+    """
+    One game read from a record file: the players, the actions and the result
+    """
+    def __init__(self, white, black, actions, winner, reason):
+        self.white = white
+        self.black = black
+        self.actions = actions
+        self.winner = winner
+        self.reason = reason
+
+    def replay(self, n_actions=None):
+        """
+        :param n_actions: number of actions to play (None for all of them)
+        :return: the referee's _Game after the first n_actions actions of the game
+        """
+        game = _Game()
+        for action in self.actions[:n_actions]:
+            game.update(action)
+        return game
+
+
+class GameRecordReader:
+    """
+    Reads the games of a record file in any order: game k is found through the offset index,
+    which is rebuilt by scanning the record file when it doesn't exist.
+    """
+    def __init__(self, path):
+        if not os.path.exists(path + INDEX_SUFFIX):
+            build_index(path)
+        self._file = open(path, 'rb')
+        self._index = open(path + INDEX_SUFFIX, 'rb')
+        self._size = os.path.getsize(path + INDEX_SUFFIX) // OFFSET.size
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for k in range(self._size):
+            yield self.read_game(k)
+
+    def read_game(self, k):
+        """
+        :return: the GameRecord of the k-th game of the file
+        """
+        if not 0 <= k < self._size:
+            raise IndexError(f'game {k} of {self._size}')
+        self._index.seek(k * OFFSET.size)
+        offset, = OFFSET.unpack(self._index.read(OFFSET.size))
+        self._file.seek(offset)
+        return _read_record(self._file)
+
+    def close(self):
+        self._file.close()
+        self._index.close()
+
+
+def _read_record(f):
+    """
+    read the game at the position of f
+    :return: its GameRecord, or None if the file ends before the end of the game
+    """
+    header = f.read(RECORD_HEADER.size)
+    if len(header) < RECORD_HEADER.size:
+        return None
+    magic, version, white_length, black_length = RECORD_HEADER.unpack(header)
+    if magic != RECORD_MAGIC or version != RECORD_VERSION:
+        raise ValueError(f'no game record at offset {f.tell() - RECORD_HEADER.size}')
+    white = f.read(white_length).decode()
+    black = f.read(black_length).decode()
+
+    actions = []
+    while True:
+        data = f.read(ACTION.size)
+        if len(data) < ACTION.size:
+            return None
+        source, dest = ACTION.unpack(data)
+        if source == END_OF_GAME:
+            return GameRecord(white, black, actions, WINNERS[dest & WINNER_MASK], REASONS[dest & ~WINNER_MASK])
+        if source > NO_SQUARE or dest > NO_SQUARE:
+            raise ValueError(f'invalid action at offset {f.tell() - ACTION.size}')
+        actions.append(decode_action(source, dest))
+
+
+def build_index(path):
+    """
+    write the index of the record file path, with the offset of every complete game in it
+    """
+    with open(path, 'rb') as f, open(path + INDEX_SUFFIX, 'wb') as index:
+        while True:
+            offset = f.tell()
+            try:
+                record = _read_record(f)
+            except ValueError:
+                # the rest of a game that never finished, go on from the next game
+                f.seek(offset + 1)
+                if not _find_next_record(f):
+                    return
+                continue
+            if record is None:
+                return
+            index.write(OFFSET.pack(offset))
+
+
+def _find_next_record(f):
+    """
+    move f to the start of the next game record
+    :return: False if there is none
+    """
+    marker = RECORD_MAGIC + bytes([RECORD_VERSION])
+    start = f.tell()
+    data = b''
+    while True:
+        chunk = f.read(SCAN_CHUNK_SIZE)
+        if not chunk:
+            return False
+        # keep the end of the last chunk, the marker may start in it
+        data = data[-(len(marker) - 1):] + chunk
+        position = data.find(marker)
+        if position >= 0:
+            f.seek(f.tell() - len(data) + position)
+            return True
@@ -0,0 +1,308 @@
+from BoardState import BoardState, SUM_TURNS_PLACE_PHASE, square_to_coord, move_to_referee
+from BitBoardState import BitBoardState
+from Player import TIME_BANK, MOVES_TO_GO, MAX_MOVE_TIME, TIME_RESERVE, USE_BITBOARD
+from concurrent.futures import ProcessPoolExecutor
+import math
+import random
+import time
+
+# exploration constant of UCT, the square root of 2 of UCB1
+EXPLORATION = math.sqrt(2)
+
+# the tree stops growing at this many nodes, iterations then go on with rollouts from its leaves
+MAX_TREE_NODES = 200000
+
+# a rollout that hasn't ended the game after this many actions is scored by the pieces left
+MAX_ROLLOUT_ACTIONS = 80
+
+# in a rollout, a capture is played with this probability when there is one, otherwise any action
+CAPTURE_PROBABILITY = 0.8
+
+# number of worker processes that grow trees of their own, their root visits are added to the
+# ones of the tree of this process (0 for no workers)
+MCTS_WORKERS = 0
+
+# the clock is read once every this many iterations
+ITERATIONS_BETWEEN_TIME_CHECKS = 16
+
+
+# player of a worker process, kept between tasks
+_worker_player = None
+
+
+def _search_worker(colour, board, turns, time_budget, seed):
+    """
+    grow a tree from board in a worker process for time_budget seconds
+    :return: dictionary of every root action to its visits
+    """
+    global _worker_player
+    if _worker_player is None:
+        _worker_player = Player(colour, workers=0)
+    random.seed(seed)
+    _worker_player._board = board
+    return _worker_player.search(turns, time.perf_counter() + time_budget).get_child_visits()
+
+
+class _TreeNode:
+    """
+    Node of the search tree. It holds the action that led to it, the color that played that action
+    and the statistics of the rollouts through it, as wins of that color (a draw is half a win).
+    Like the nodes of the alpha-beta search, the board is not kept in the node: the actions are
+    applied to the shared board on the way down and taken back after every iteration.
+    """
+    __slots__ = ('move', 'color', 'parent', 'children', 'untried', 'visits', 'wins')
+
+    def __init__(self, move, color, parent):
+        self.move = move
+        self.color = color
+        self.parent = parent
+        self.children = []
+        # actions of the color to play not expanded yet, None until the node is first expanded
+        self.untried = None
+        self.visits = 0
+        self.wins = 0.0
+
+    def select_child(self):
+        """
+        :return: the child with the best UCT score
+        """
+        log_visits = math.log(self.visits)
+        return max(self.children,
+                   key=lambda child: child.wins / child.visits + EXPLORATION * math.sqrt(log_visits / child.visits))
+
+    def get_child_visits(self):
+        return {child.move: child.visits for child in self.children}
+
+
+class Player:
+    def __init__(self, colour, time_bank=TIME_BANK, workers=MCTS_WORKERS):
+        """
+        called by the referee once at the beginning of the game to initialise.
+        :param colour:  string representing the piece colour your program will control for this game.
+        can be 'white' or 'black
+        :param time_bank: total thinking time (seconds) of the player for the whole game
+        :param workers: number of worker processes growing trees of their own (0 for none)
+        """
+        random.seed(9011)
+        self._color = colour
+        self._opponent_color = self.get_opponent_color()
+        if USE_BITBOARD:
+            self._board = BitBoardState()
+        else:
+            self._board = BoardState()
+
+        self._time_left = time_bank
+        self._tree_size = 0
+
+        # the pool is started on the first search and kept for the whole game
+        self._workers = workers
+        self._pool = None
+
+    def get_color(self):
+        return self._color
+
+    def get_board(self):
+        return self._board
+
+    def get_opponent_color(self):
+        if self._color == 'white':
+            return 'black'
+        return 'white'
+
+    def get_move_time_budget(self):
+        """
+        :return: how long (seconds) the player may think on the current move
+        """
+        return max(0.0, min(MAX_MOVE_TIME, (self._time_left - TIME_RESERVE) / MOVES_TO_GO))
+
+    def get_actions(self, color):
+        """
+        :return: the actions of color on the board, in squares (see BoardState.move_to_referee), [None] when
+        it has no move and forfeits the turn
+        """
+        if self._board.get_is_place_phase():
+            return self._board.get_actions(color)
+        return self._board.get_actions(color) or [None]
+
+    def is_completed(self):
+        """
+        :return: True iff the game is over, like the referee's _check_win
+        """
+        board = self._board
+        if board.get_is_place_phase():
+            return False
+        return board.get_pieces_count('white') < 2 or board.get_pieces_count('black') < 2
+
+    def get_result(self, color):
+        """
+        :return: the result of color, 1 for a win, 0 for a loss and 0.5 for a draw. a completed game is
+        scored like the referee's _check_win (both colors below 2 pieces is a draw), a rollout cut off
+        before the end by the number of pieces
+        """
+        own = self._board.get_pieces_count(color)
+        enemy = self._board.get_pieces_count(self._board.get_opposite_color(color))
+        if self.is_completed():
+            if own < 2 and enemy < 2:
+                return 0.5
+            return 0.0 if own < 2 else 1.0
+        if own > enemy:
+            return 1.0
+        if own < enemy:
+            return 0.0
+        return 0.5
+
+    def play(self, color, move, turns):
+        """
+        apply an action to the board, it is taken back with board.unmake_move
+        :return: the turns of the next action
+        """
+        board = self._board
+        is_place_phase = board.get_is_place_phase()
+        board.make_move(color, move, turns)
+        if is_place_phase and turns == SUM_TURNS_PLACE_PHASE - 1:
+            # the moving phase counts its turns from 0
+            return 0
+        return turns + 1
+
+    def search(self, turns, deadline):
+        """
+        Monte-Carlo tree search from the board until the deadline: every iteration selects a path of the
+        tree by UCT, expands one new node at its end, plays a rollout from it and adds the result to the
+        nodes of the path.
+        :return: the root of the tree
+        """
+        board = self._board
+        made_moves = board.get_made_moves()
+        root = _TreeNode(None, self._opponent_color, None)
+        self._tree_size = 1
+
+        iterations = 0
+        while iterations % ITERATIONS_BETWEEN_TIME_CHECKS != 0 or time.perf_counter() < deadline:
+            iterations += 1
+            node, node_turns = root, turns
+
+            # selection, down to a node with actions not expanded yet (unless the tree is full)
+            while node.children and (not node.untried or self._tree_size >= MAX_TREE_NODES):
+                node = node.select_child()
+                node_turns = self.play(node.color, node.move, node_turns)
+            color = board.get_opposite_color(node.color)
+
+            # expansion
+            if not self.is_completed():
+                if node.untried is None:
+                    node.untried = self.get_actions(color)
+                    random.shuffle(node.untried)
+                if node.untried and self._tree_size < MAX_TREE_NODES:
+                    child = _TreeNode(node.untried.pop(), color, node)
+                    node.children.append(child)
+                    self._tree_size += 1
+                    node = child
+                    node_turns = self.play(color, node.move, node_turns)
+                    color = board.get_opposite_color(color)
+
+            result = self.rollout(color, node_turns)
+
+            # backpropagation, result is the share of the win of white
+            while board.get_made_moves() > made_moves:
+                board.unmake_move()
+            while node is not None:
+                node.visits += 1
+                node.wins += result if node.color == 'white' else 1.0 - result
+                node = node.parent
+        return root
+
+    def rollout(self, color, turns):
+        """
+        play random actions from the board until the game ends, captures are played first with
+        CAPTURE_PROBABILITY. the actions are left on the board.
+        :param color: color to play
+        :return: the result of the game for white, 1 for a win, 0 for a loss and 0.5 for a draw
+        """
+        board = self._board
+        for _ in range(MAX_ROLLOUT_ACTIONS):
+            if self.is_completed():
+                break
+            move = None
+            if random.random() < CAPTURE_PROBABILITY:
+                captures = board.generate_capture_moves(color)
+                if captures:
+                    move = random.choice(captures)
+            if move is None:
+                move = random.choice(self.get_actions(color))
+            turns = self.play(color, move, turns)
+            color = board.get_opposite_color(color)
+        return self.get_result('white')
+
+    def get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self._workers)
+        return self._pool
+
+    def choose_action(self, actions, turns):
+        """
+        search the board for the time budget of the move, in this process and in the workers
+        :return: the action of the root visited the most
+        """
+        if len(actions) == 1:
+            return actions[0]
+        time_budget = self.get_move_time_budget()
+        futures = []
+        if self._workers > 0:
+            pool = self.get_pool()
+            futures = [pool.submit(_search_worker, self._color, self._board, turns, time_budget,
+                                   random.getrandbits(32))
+                       for _ in range(self._workers)]
+
+        visits = self.search(turns, time.perf_counter() + time_budget).get_child_visits()
+        for future in futures:
+            for move, count in future.result().items():
+                visits[move] = visits.get(move, 0) + count
+        return max(actions, key=lambda action: visits.get(action, 0))
+
+    def action(self, turns, time_left=None):
+        """
+        This method is called by the referee to request an action by your player.
+        :param turns: turns is an integer representing the number of turns that have
+        taken place since the start of the current game phase
+        :param time_left: seconds left on the player's clock, when the referee keeps one
+        :return: the next action of the player in a format of:
+                 (x,y) -  placing a piece on square (x,y)
+                 ((a,b),(c,d)) -  moving a piece from square (a,b) to square (c,d)
+                 None - forfeiting the turn when there is no move
+        """
+        start = time.perf_counter()
+        if time_left is not None:
+            # the referee's clock is the one that counts
+            self._time_left = time_left
+        self._board.check_shrink_board(turns)
+        move = self.choose_action(self.get_actions(self._color), turns)
+
+        if move is None:
+            pass
+        elif self._board.get_is_place_phase():
+            self._board.place_piece(self._color, square_to_coord(move))
+        else:
+            (source_row, source_col), (dest_row, dest_col) = square_to_coord(move[0]), square_to_coord(move[1])
+            self._board.move_piece(self._color, source_row, source_col, dest_row, dest_col)
+        return_val = move_to_referee(move)
+
+        self._board.check_update_phase(turns)
+        # the referee shrinks the board right after the action of the turn before a shrink
+        self._board.check_shrink_board(turns + 1)
+
+        self._time_left -= time.perf_counter() - start
+        return return_val
+
+    def update(self, action):
+        """
+        This method is called by the referee to inform your player about the opponent’s
+        most recent move, so that you can maintain your internal board configuration.
+        :param action: representation of the opponent’s recent action, None when it forfeited the turn
+        """
+        if action is None:
+            return
+        if not isinstance(action[0], tuple):
+            self._board.place_piece(self._opponent_color, (action[1], action[0]))
+        else:
+            self._board.remove_piece(self._opponent_color, (action[0][1], action[0][0]))
+            self._board.place_piece(self._opponent_color, (action[1][1], action[1][0]))
@@ -1,18 +1,25 @@
-import copy
 class Node:
     """
     This class of Node contains the information of node in the search tree.
-    each node contains board_state, his parent, successors.
+    each node contains the move that led to it, the hash of its state, the color to play and the turns.
+    All the nodes of a search share one board: a child is visited by applying its move
+    with board.make_move and taking it back with board.unmake_move, so the board holds
+    the state of the node currently being searched. Nodes keep no board, parent or children,
+    so a node can be freed as soon as it is searched.
+    A state and its mirror image have the same hash (see board.get_canonical_hash), so the moves stored
+    for the hash are mirrored for the node of a mirrored state.
     """
-    def __init__(self, board_state, parent, depth, color, turns):
-        # current state of the board this node represents
-        self._board = board_state
+    __slots__ = ('_move', '_hash', '_depth', '_color', '_turns', '_mirrored')
 
-        # parent node, used to traverse up sequence of nodes once goal state found
-        self._parent = parent
+    def __init__(self, move, board_hash, depth, color, turns, mirrored=False):
+        # move that led from the parent to this node (None for the root)
+        self._move = move
 
-        # collection of successor nodes
-        self._successors = []
+        # Zobrist hash of the state of this node, with the color to play
+        self._hash = board_hash
+
+        # True iff the hash is the hash of the mirror image of the state
+        self._mirrored = mirrored
 
         # depth of the node in the tree, to know stop expanding because of cut-off
         self._depth = depth
@@ -27,58 +34,68 @@ class Node:
     def get_color(self):
         return self._color
 
+    def get_move(self):
+        return self._move
 
-    def get_board(self):
-        return self._board
-
-    def get_depth(self):
-        return self._depth
-
-    def expand_successors(self):
-        self._board.check_shrink_board(self._turns)
-
-        if self._board.get_is_place_phase():
-            coords_list = self._board.get_empty_tiles(self._color)
-
-            for coord in coords_list:
-                row, col = coord[0], coord[1]
-
-                # create copy of current board
-                new_board = copy.deepcopy(self._board)
-
-
-                # update the copy with the placement
-                new_board.place_piece(self._color, (row, col))
-
-                new_board.check_update_phase(self._turns)
-
-                # update successors with the new board state
-                self._successors.append(Node(new_board, self, self._depth + 1,
-                new_board.get_opposite_color(self._color), self._turns + 1))
-
-        else:
-            coords_list = self._board.get_available_moves(self._color)
-            for coord in coords_list:
-                source, dest = coord[0], coord[1]
-                source_row, source_col, dest_row, dest_col = source[0], source[1], dest[0], dest[1]
-
-                # create copy of current board
-                new_board = copy.deepcopy(self._board)
-
-
-                # update the copy with the move
-                new_board.move_piece(self._color, source_row, source_col, dest_row, dest_col)
-
-                new_board.check_update_phase(self._turns)
+    def get_hash(self):
+        return self._hash
 
-                self._successors.append(Node(new_board, self, self._depth + 1,
-                                             self._board.get_opposite_color(self._color), self._turns+1))
+    def is_mirrored(self):
+        return self._mirrored
 
-    def get_successors(self):
-        return self._successors
+    @classmethod
+    def make_root(cls, board, color, turns):
+        """
+        :return: the root node of a search of board, with the canonical hash of its state
+        """
+        board_hash, mirrored = board.get_canonical_hash(color)
+        return cls(None, board_hash, 0, color, turns, mirrored)
 
-    def get_parent(self):
-        return self._parent
+    def get_depth(self):
+        return self._depth
 
-    def get_move(self):
-        return self._move
+    def expand_moves(self, board):
+        """
+        :param board: the shared board, in the state of this node
+        :return: the actions available to the color to play, in squares (see BoardState.move_to_referee),
+        [None] when it has no move in the moving phase: it forfeits the turn, like in the referee
+        """
+        if board.get_is_place_phase():
+            return board.get_actions(self._color)
+        return board.get_actions(self._color) or [None]
+
+    def expand_successors(self, board, order_moves, first_move=None):
+        """
+        generator of the (move, child) pairs of the node, built one at a time only when asked for.
+        The board holds the state of the last child yielded until the next one is asked for or the
+        generator is closed, so a caller that stops early (a cutoff) has to close it.
+        :param board: the shared board, in the state of this node
+        :param order_moves: function (node, moves) -> moves in the order they should be searched
+        :param first_move: move to search before the others are even generated, like the best move
+        stored in the transposition table
+        """
+        if first_move is not None:
+            yield from self._make_children(board, (first_move,))
+
+        moves = self.expand_moves(board)
+        if first_move is not None and first_move in moves:
+            moves.remove(first_move)
+        yield from self._make_children(board, order_moves(self, moves))
+
+    def _make_children(self, board, moves):
+        for move in moves:
+            child = self.make_child(board, move)
+            try:
+                yield move, child
+            finally:
+                board.unmake_move()
+
+    def make_child(self, board, move):
+        """
+        apply move to the shared board and return the node of the resulting state.
+        the caller has to take the move back with board.unmake_move once the child is searched.
+        """
+        board.make_move(self._color, move, self._turns)
+        color = board.get_opposite_color(self._color)
+        board_hash, mirrored = board.get_canonical_hash(color)
+        return Node(move, board_hash, self._depth + 1, color, self._turns + 1, mirrored)
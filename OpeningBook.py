@@ -0,0 +1,83 @@
+import mmap
+import os
+import struct
+
+from BoardState import mirror_move
+
+# first bytes of a book file, changed whenever the meaning of the records changes
+BOOK_MAGIC = b'WYBBOOK2'
+
+# first bytes of the book files of older formats: raw (not canonical) hashes
+OLD_BOOK_MAGICS = (b'WYBBOOK1',)
+
+# one record per position: canonical Zobrist hash (with the color to play, see Zobrist.canonical_key) and
+# the square row * 8 + col of the placement on the board of that hash.
+# records are sorted by hash so a position is found with a binary search
+BOOK_RECORD = struct.Struct('<QB')
+
+
+def write_book(path, book):
+    """
+    :param book: dictionary of canonical position hash to the square of the placement to play
+    """
+    with open(path, 'wb') as f:
+        f.write(BOOK_MAGIC)
+        for key in sorted(book):
+            f.write(BOOK_RECORD.pack(key, book[key]))
+
+
+class OpeningBook:
+    """
+    Read only opening book of the placing phase, written by build_book.py.
+    The file is memory mapped, so only the pages a lookup touches are read from disk.
+    A position and its mirror image have the same canonical hash, so the book stores one
+    record for both, and the placement is reflected left-right for the mirrored one.
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic = self._map[:len(BOOK_MAGIC)]
+        if magic != BOOK_MAGIC:
+            self._map.close()
+            if magic in OLD_BOOK_MAGICS:
+                raise ValueError(path + ' is an opening book of an older format, build it again with build_book.py')
+            raise ValueError(path + ' is not an opening book')
+        self._size = (len(self._map) - len(BOOK_MAGIC)) // BOOK_RECORD.size
+
+    @classmethod
+    def load(cls, path):
+        """
+        :return: the book of path, or None if there is no such file
+        """
+        if not os.path.exists(path):
+            return None
+        return cls(path)
+
+    def __len__(self):
+        return self._size
+
+    def lookup(self, board, color):
+        """
+        :return: the square of the placement of the book for color to play on board, or None
+        """
+        key, mirrored = board.get_canonical_hash(color)
+        square = self._find(key)
+        if square is not None and mirrored:
+            return mirror_move(square)
+        return square
+
+    def _find(self, key):
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            record_key, square = BOOK_RECORD.unpack_from(self._map, len(BOOK_MAGIC) + middle * BOOK_RECORD.size)
+            if record_key == key:
+                return square
+            if record_key < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def close(self):
+        self._map.close()
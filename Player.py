@@ -1,45 +1,226 @@
-from BoardState import BoardState
+from BoardState import BoardState, SUM_TURNS_PLACE_PHASE, mirror_move, square_to_coord, move_to_referee, \
+    referee_to_move
+from BitBoardState import BitBoardState
 from Node import Node
-import random
+from TranspositionTable import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+from OpeningBook import OpeningBook
+from Tablebase import Tablebase, WIN, LOSS
+from SearchStats import SearchStats
+from Zobrist import canonical_key
+from concurrent.futures import ProcessPoolExecutor, wait
 import copy
-from operator import itemgetter
-CUT_OFF_DEPTH_LIMIT = 3
+import multiprocessing
+import os
+import random
+import threading
+import time
+
+# iterative deepening stops at this depth even if there is time left
+CUT_OFF_DEPTH_LIMIT = 12
+
+# total thinking time (seconds) of the player for a whole game
+TIME_BANK = 100.0
+
+# the time left is shared as if this many moves are still to be played
+MOVES_TO_GO = 30
+
+# never think longer than this (seconds) on a single move
+MAX_MOVE_TIME = 5.0
+
+# seconds of the time left kept out of the budget of every move, for the time the search takes to
+# stop after its deadline and for the time spent outside the search
+TIME_RESERVE = 0.1
+
+# a deeper iteration is expected to take this many times longer than the last one,
+# so it is not started when it can't finish before the deadline
+BRANCHING_ESTIMATE = 4
+
+# the clock is read once every this many nodes
+NODES_BETWEEN_TIME_CHECKS = 1024
+
+# half width of the window the root is searched in around the value of the previous iteration,
+# searched again with the full window when the value falls outside it
+ASPIRATION_WINDOW = 30
+
+# plies the quiescence search goes on below the cut-off, searching only captures and escapes from
+# capture threats (0 evaluates the cut-off nodes as they are)
+QUIESCENCE_DEPTH_LIMIT = 4
+
+# move ordering priorities, history scores stay below KILLER_MOVE_PRIORITY
+CAPTURE_MOVE_PRIORITY = 3000000
+KILLER_MOVE_PRIORITY = 2000000
+
+# number of killer moves kept per ply
+KILLER_MOVES_PER_PLY = 2
+
+# number of worker processes the root operators are split across (0 searches in this process only)
+PARALLEL_WORKERS = 0
+
+# number of entries of the transposition table
+TRANSPOSITION_TABLE_SIZE = 1 << 18
+
+# opening book of the placing phase written by build_book.py, the placing phase is searched
+# as usual when the file doesn't exist
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening.book')
+
+# endgame tablebase of the shrunk boards written by build_tablebase.py, not probed when the file
+# doesn't exist
+TABLEBASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'endgame.tb')
+
+# value of a position the tablebase says is won, less the plies it takes to win
+TABLEBASE_WIN_SCORE = 100000
+
+# file the stats of every search are appended to as JSON lines (None collects no stats)
+STATS_PATH = None
+
+# also measure the time the search spends in each part of the board code, which slows the search down
+STATS_TIME_BOARD = False
+
+# search the position after the predicted reply of the opponent in a background thread while the
+# opponent thinks. it only pays off when the opponent runs in another process, a thread of the same
+# process shares the interpreter (and its CPU time) with it
+PONDER = False
+
+# the pondering thread stops by itself after this many seconds, in case no update comes (the game is over)
+MAX_PONDER_TIME = 2 * MAX_MOVE_TIME
+
+# search on the bitboard engine (False falls back to the list based BoardState)
+USE_BITBOARD = True
 
 # a constant
 INFINITY = 1.0e400
 
+class _SearchTimeout(Exception):
+    """For when the deadline of the current move has passed in the middle of a search"""
+
+
+# state of a worker process of the parallel root search. the worker keeps its player (and so its
+# transposition table and history) between tasks, so the tables are not rebuilt every move
+_worker_player = None
+_worker_alpha = None
+
+
+def _init_worker(colour, shared_alpha):
+    global _worker_player, _worker_alpha
+    _worker_player = Player(colour, workers=0)
+    _worker_alpha = shared_alpha
+
+
+def _search_root_operator(board, op, turns, depth_limit, deadline):
+    """
+    search one root operator in a worker process, starting from the best alpha found so far by
+    the other workers, and share the value found with the workers that start after it.
+    :param deadline: wall clock time (time.time()) the search of the move has to end by
+    :return: (value, exact) of op, where a value that isn't exact is an upper bound of it, or None
+    if the deadline passed first
+    """
+    with _worker_alpha.get_lock():
+        alpha = _worker_alpha.value
+    result = _worker_player.search_root_operator(board, op, turns, depth_limit, deadline, alpha)
+    if result is not None and result[1]:
+        with _worker_alpha.get_lock():
+            if result[0] > _worker_alpha.value:
+                _worker_alpha.value = result[0]
+    return result
+
+
 class Player:
-    def __init__(self, colour):
+    def __init__(self, colour, time_bank=TIME_BANK, workers=PARALLEL_WORKERS, book_path=BOOK_PATH,
+                 tablebase_path=TABLEBASE_PATH, stats_path=STATS_PATH, ponder=PONDER, seed=9009):
         """
         called by the referee once at the beginning of the game to initialise.
         Here we will set the state of the board and more states we will want to maintain during the game.
         :param colour:  string representing the piece colour your program will control for this game.
         can be 'white' or 'black
+        :param time_bank: total thinking time (seconds) of the player for the whole game
+        :param workers: number of worker processes the root operators are split across (0 for none)
+        :param book_path: opening book file of the placing phase (None for no book)
+        :param tablebase_path: endgame tablebase file (None for no tablebase)
+        :param stats_path: file to append the stats of every search to (None for no stats)
+        :param ponder: search the predicted reply of the opponent while it thinks
+        :param seed: seed of the random module (None leaves it as it is)
         """
 
-        random.seed(9009)
+        if seed is not None:
+            random.seed(seed)
         self._color = colour
         self._opponent_color = self.get_opponent_color()
-        self._board = BoardState()
-
-    def get_place_eval(self, node):
-
-        white_eval = len(node.get_board().get_white_loc())
-        black_eval = len(node.get_board().get_black_loc())
-
-        if self._color == 'white':
-
-            return node.get_board().rank_pieces_loc(self._color)
+        if USE_BITBOARD:
+            self._board = BitBoardState()
         else:
+            self._board = BoardState()
+
+        # kept for the whole game, entries of older searches are replaced first. shared with the
+        # pondering thread when there is one
+        self._table = TranspositionTable(TRANSPOSITION_TABLE_SIZE, thread_safe=ponder)
+
+        self._time_left = time_bank
+
+        self._book = None
+        if book_path is not None:
+            self._book = OpeningBook.load(book_path)
+        self._tablebase = None
+        if tablebase_path is not None:
+            self._tablebase = Tablebase.load(tablebase_path)
+        self._stats = None
+        if stats_path is not None:
+            self._stats = SearchStats(stats_path, colour, time_board=STATS_TIME_BOARD)
+
+        # state of the current iterative deepening search
+        self._depth_limit = 1
+        self._deadline = INFINITY
+        # the same deadline on the wall clock, which the worker processes of the parallel search share
+        self._wall_deadline = INFINITY
+        self._nodes = 0
+        self._iteration_best = None
+        # set by another thread to stop the search, like the deadline
+        self._stop = threading.Event()
+
+        # move ordering: killer moves per ply of the current search, and history scores of
+        # the moves that caused cutoffs by (color, move), kept (and aged) for the whole game
+        self._killers = []
+        self._history = {}
+
+        # depth and value of the last iteration that finished
+        self._completed_depth = 0
+        self._completed_value = None
+        # the reply of the opponent the last search expects. when the opponent plays it, the next search
+        # goes on from the (depth, value) the position was already searched to instead of from scratch
+        self._predicted_reply = None
+        self._resume = None
+
+        # pondering: a second player searching in a thread, with the transposition table of this one
+        self._ponder = ponder
+        self._ponderer = None
+        self._ponder_thread = None
+
+        # parallel root search, the pool is started on the first search and kept for the whole game
+        self._workers = workers
+        self._pool = None
+        self._shared_alpha = None
+        self._search_turns = None
+
+    def get_color(self):
+        return self._color
+
+    def get_board(self):
+        return self._board
 
-            return node.get_board().rank_pieces_loc(self._color)
+    def get_place_eval(self, node):
+        return self._board.rank_pieces_loc(self._color)
 
     def get_eval(self, node):
-        if self._color == 'white':
-            return node.get_board().rank_pieces_loc(self._color) + 10*(len(node.get_board().get_white_loc()) - len(node.get_board().get_black_loc()))
-        else:
-            return node.get_board().rank_pieces_loc(self._color) + 10*(len(node.get_board().get_black_loc()) - len(node.get_board().get_white_loc()))
+        board = self._board
+        return board.rank_pieces_loc(self._color) + \
+            10*(board.get_pieces_count(self._color) - board.get_pieces_count(self._opponent_color))
 
+    def evaluate(self, node):
+        """
+        :return: get_eval of the position of node for the color to play at node, as negamax needs it
+        """
+        if node.get_color() == self._color:
+            return self.get_eval(node)
+        return - self.get_eval(node)
 
     def get_opponent_color(self):
         if self._color == 'white':
@@ -51,10 +232,145 @@ class Player:
         :param node: node which represents a state of the board
         :return: boolean - true is node is in the depth of cut-off limit, false - otherwise.
         """
-        if node.get_depth() >= CUT_OFF_DEPTH_LIMIT:
+        if node.get_depth() >= self._depth_limit:
             return True
         return False
 
+    def get_move_time_budget(self):
+        """
+        :return: how long (seconds) the player may think on the current move
+        """
+        return max(0.0, min(MAX_MOVE_TIME, (self._time_left - TIME_RESERVE) / MOVES_TO_GO))
+
+    def predict_reply(self):
+        """
+        remember the reply of the opponent the last search expects after the action just played: the best
+        move stored in the transposition table for the position. the search has to have gone at least one
+        ply past it for the reply to be worth resuming from.
+        """
+        self._predicted_reply = None
+        if self._completed_depth < 3:
+            return
+        self._predicted_reply = self.get_table_move(self._opponent_color)
+
+    def get_table_move(self, color):
+        """
+        :return: the best move stored in the transposition table for the board with color to play, or None
+        """
+        key, mirrored = self._board.get_canonical_hash(color)
+        entry = self._table.probe(key)
+        if entry is None:
+            return None
+        if mirrored:
+            return mirror_move(entry[4])
+        return entry[4]
+
+    def drop_mirror_duplicates(self, operators):
+        """
+        :return: the operators without the mirror image of an operator before it, when the board is its own
+        mirror image: an operator and its mirror image lead to mirror positions, which have the same value
+        """
+        if not (self._board.is_symmetric() and self._board.is_mirror_invariant()):
+            return operators
+        kept = []
+        seen = set()
+        for op in operators:
+            if op not in seen:
+                kept.append(op)
+                seen.add(mirror_move(op))
+        return kept
+
+    def check_reply(self, move):
+        """
+        called with the reply of the opponent, the next search resumes from the last one if it was predicted
+        """
+        ponder_hit = self.stop_pondering() and move == self._predicted_reply
+        if ponder_hit and self._ponderer.get_completed_depth() > self._completed_depth - 2:
+            # the pondering thread searched the position of the next action, deeper than the last search did
+            self._resume = (self._ponderer.get_completed_depth(), self._ponderer.get_completed_value())
+            self._killers = self._ponderer.get_killers()
+        elif move is not None and move == self._predicted_reply:
+            self._resume = (self._completed_depth - 2, self._completed_value)
+            self._killers = self._killers[2:]
+        else:
+            self._resume = None
+        self._predicted_reply = None
+
+    def get_completed_depth(self):
+        return self._completed_depth
+
+    def get_completed_value(self):
+        return self._completed_value
+
+    def get_killers(self):
+        return self._killers
+
+    def start_pondering(self, turns):
+        """
+        search the position after the predicted reply in a background thread, until stop_pondering
+        :param turns: turns of the next action of the player
+        """
+        if self._predicted_reply is None:
+            return
+        board = copy.deepcopy(self._board)
+        self.apply_opponent_action(board, self._predicted_reply)
+        board.check_shrink_board(turns)
+        operators = board.get_actions(self._color)
+        if not operators:
+            return
+
+        if self._ponderer is None:
+            # created in the middle of the game, so it mustn't reset the random numbers of the game
+            self._ponderer = Player(self._color, workers=0, book_path=None, tablebase_path=None, ponder=False,
+                                    seed=None)
+        # the position is a grandchild of the root of the last search, like when resuming from it
+        self._ponderer.set_ponder_state(board, self._table, self._tablebase, self._history, self._killers[2:],
+                                        (self._completed_depth - 2, self._completed_value))
+        self._ponder_thread = threading.Thread(target=self._ponderer.iterative_deepening,
+                                               args=(operators, turns, CUT_OFF_DEPTH_LIMIT, MAX_PONDER_TIME),
+                                               daemon=True)
+        self._ponder_thread.start()
+
+    def set_ponder_state(self, board, table, tablebase, history, killers, resume):
+        """
+        get the pondering player ready to search board, with the tables of the player it ponders for
+        """
+        self._board = board
+        self._table = table
+        self._tablebase = tablebase
+        self._history = dict(history)
+        self._killers = [list(ply_killers) for ply_killers in killers]
+        self._resume = resume
+        self._stop.clear()
+
+    def stop(self):
+        """
+        stop the search running in another thread, at its next check of the deadline
+        """
+        self._stop.set()
+
+    def stop_pondering(self):
+        """
+        stop the pondering thread and wait for it
+        :return: True iff it was pondering
+        """
+        if self._ponder_thread is None:
+            return False
+        self._ponderer.stop()
+        self._ponder_thread.join()
+        self._ponder_thread = None
+        return True
+
+    def check_deadline(self):
+        """
+        count a searched node, and stop the search if the deadline of the move has passed or it was stopped
+        :raises _SearchTimeout: when the deadline has passed
+        """
+        self._nodes += 1
+        if self._nodes % NODES_BETWEEN_TIME_CHECKS == 0 and \
+                (time.perf_counter() > self._deadline or self._stop.is_set()):
+            raise _SearchTimeout()
+
     # def minimax_decision(self, operators, turns):
     #     max_val = -INFINITY
     #     operation = operators[0]
@@ -89,109 +405,520 @@ class Player:
     #         node.expand_successors()
     #         return min(self.minimax_value(node) for node in node.get_successors())
 
-    def minimax_decision(self, operators, turns):
-        operation = operators[0]
-        alpha = - INFINITY
-        beta = INFINITY
+    def minimax_decision(self, operators, turns, max_depth=CUT_OFF_DEPTH_LIMIT, time_budget=None):
+        """
+        search the operators with iterative deepening, and write the stats of the search when they are collected
+        :param max_depth: depth of the last iteration
+        :param time_budget: seconds to think (None for the budget of the time left)
+        """
+        if self._stats is None:
+            return self.iterative_deepening(operators, turns, max_depth, time_budget)
+
+        self._stats.start_move(turns, len(operators))
+        board = self._board
+        if self._workers == 0:
+            # the workers of a parallel search have boards of their own, which aren't timed
+            self._board = self._stats.timed_board(board)
+        try:
+            operation = self.iterative_deepening(operators, turns, max_depth, time_budget)
+        finally:
+            self._board = board
+        self._stats.end_move(operation)
+        return operation
 
-        for op in operators:
-            op_board = copy.deepcopy(self._board)
-            if op_board.get_is_place_phase():
-                row, col = op[0], op[1]
-                op_board.place_piece(self._color, (row, col))
-            else:
-                source, dest = op[0], op[1]
-                source_row, source_col, dest_row, dest_col = source[0], source[1], dest[0], dest[1]
+    def iterative_deepening(self, operators, turns, max_depth, time_budget):
+        """
+        iterative deepening: search the operators one ply deeper at a time until the time budget
+        of the move runs out, and return the best operator of the last search that finished.
+        """
+        if time_budget is None:
+            time_budget = self.get_move_time_budget()
+        start = time.perf_counter()
+        self._deadline = start + time_budget
+        self._wall_deadline = time.time() + time_budget
+        self._nodes = 0
+        self.age_history()
+
+        resume, self._resume = self._resume, None
+        scores = {}
+        value = None
+        first_depth = 1
+        if resume is None:
+            self._table.new_search()
+            self._killers = [[] for _ in range(max_depth + 1)]
+        else:
+            # the position was searched by the last search (or the pondering thread): its entries in the
+            # transposition table are kept as entries of the current search, and so are its killer moves
+            searched_depth, value = resume
+            self._killers += [[] for _ in range(max_depth + 1 - len(self._killers))]
+            table_move = self.get_table_move(self._color)
+            if table_move in operators:
+                scores[table_move] = INFINITY
+            first_depth = min(searched_depth + 1, max_depth)
+        self._completed_depth = 0
+        self._completed_value = None
+        operators = self.drop_mirror_duplicates(operators)
+        if not operators:
+            # the turn is forfeited
+            return None
+
+        # the best operator found so far first, it is the fallback when the first iteration doesn't finish
+        operators = sorted(operators, key=lambda op: scores.get(op, - INFINITY), reverse=True)
+        operation = operators[0]
+        if len(operators) == 1:
+            return operation
+
+        made_moves = self._board.get_made_moves()
+        for depth_limit in range(first_depth, max_depth + 1):
+            self._depth_limit = depth_limit
+            iteration_start = time.perf_counter()
+            if self._stats is not None:
+                self._stats.start_iteration()
+
+            # best operator of the previous iteration first, then the others by their previous scores
+            operators = sorted(operators, key=lambda op: scores.get(op, - INFINITY), reverse=True)
+            try:
+                if self._workers > 0:
+                    operation, value, scores = self.parallel_root(operators, turns)
+                else:
+                    operation, value, scores = self.aspiration_root(operators, turns, value)
+            except _SearchTimeout:
+                # take back the moves of the unfinished search
+                while self._board.get_made_moves() > made_moves:
+                    self._board.unmake_move()
+                # operators are searched best first, so an operator that beat the previous best
+                # before the deadline is still a better choice
+                if self._iteration_best is not None:
+                    operation = self._iteration_best
+                if self._stats is not None:
+                    self._stats.end_iteration(depth_limit, False)
+                break
+
+            if self._stats is not None:
+                self._stats.end_iteration(depth_limit, True)
+            self._completed_depth, self._completed_value = depth_limit, value
+
+            now = time.perf_counter()
+            if now + (now - iteration_start) * BRANCHING_ESTIMATE > self._deadline:
+                break
 
-                op_board.move_piece(self._color, source_row, source_col, dest_row, dest_col)
+        return operation
 
-            node = Node(op_board, None, 1, self._opponent_color, turns+1)
+    def aspiration_root(self, operators, turns, guess):
+        """
+        search the operators in a window of ASPIRATION_WINDOW around guess, the value of the previous
+        iteration, and again with the full window when the value falls outside of it
+        :param guess: value of the previous iteration (None searches with the full window)
+        :return: the best operator, its value, and a dictionary of the score of every operator
+        """
+        if guess is not None and abs(guess) < INFINITY:
+            alpha, beta = guess - ASPIRATION_WINDOW, guess + ASPIRATION_WINDOW
+            operation, value, scores = self.alpha_beta_root(operators, turns, alpha, beta)
+            if alpha < value < beta:
+                return operation, value, scores
+            if self._stats is not None:
+                self._stats.aspiration_researches += 1
+            # the failed search still ordered the operators and filled the transposition table
+            operators = sorted(operators, key=lambda op: scores.get(op, - INFINITY), reverse=True)
+        return self.alpha_beta_root(operators, turns, - INFINITY, INFINITY)
+
+    def alpha_beta_root(self, operators, turns, alpha, beta):
+        """
+        principal variation search of every operator to the current depth limit: the first operator is
+        searched with the (alpha, beta) window and the others with null window scout searches, which only
+        prove an operator isn't better than the best one so far. an operator whose scout fails high is
+        searched again with the window for its exact value.
+        :return: the best operator, its value (a bound when it is outside of (alpha, beta)), and a
+        dictionary of the score of every operator
+        """
+        operation = operators[0]
+        best_val = - INFINITY
+        scores = {}
+        self._iteration_best = None
 
-            curr_val = self.minimax_value(node, 0, False, alpha, beta)
+        root = Node.make_root(self._board, self._color, turns)
+        for op in operators:
+            node = root.make_child(self._board, op)
+            curr_val = self.scout(node, alpha, beta, best_val == - INFINITY)
+            self._board.unmake_move()
+            scores[op] = curr_val
+            if curr_val > best_val:
+                best_val = curr_val
+                operation = op
             if curr_val > alpha:
+                alpha = curr_val
+                # the first operator only sets the bar, it isn't proven better than anything
+                if op != operators[0]:
+                    self._iteration_best = op
+            if alpha >= beta:
+                break
+
+        return operation, best_val, scores
+
+    def get_pool(self):
+        if self._pool is None:
+            self._shared_alpha = multiprocessing.Value('d', - INFINITY)
+            self._pool = ProcessPoolExecutor(max_workers=self._workers, initializer=_init_worker,
+                                             initargs=(self._color, self._shared_alpha))
+        return self._pool
+
+    def parallel_root(self, operators, turns):
+        """
+        like alpha_beta_root, but the operators after the first are split across the worker processes.
+        the first operator is searched here, so the workers start with its value as alpha.
+        a worker only proves an operator isn't better than the alpha it started with, so an operator
+        whose bound isn't below the best value found is searched again here.
+        :return: the best operator, its value, and a dictionary of the score of every operator
+        :raises _SearchTimeout: when an operator couldn't be searched before the deadline
+        """
+        pool = self.get_pool()
+        self._iteration_best = None
+
+        root = Node.make_root(self._board, self._color, turns)
+        node = root.make_child(self._board, operators[0])
+        try:
+            alpha = - self.negamax(node, - INFINITY, INFINITY)
+        finally:
+            self._board.unmake_move()
+        operation = operators[0]
+        scores = {operation: alpha}
+
+        self._shared_alpha.value = alpha
+        futures = {pool.submit(_search_root_operator, self._board, op, turns, self._depth_limit,
+                               self._wall_deadline): op
+                   for op in operators[1:]}
+        _, pending = wait(futures, timeout=max(0.0, self._wall_deadline - time.time()))
+        if pending:
+            # the running tasks stop by themselves at the deadline
+            for future in pending:
+                future.cancel()
+            raise _SearchTimeout()
+
+        bounds = {}
+        for future, op in futures.items():
+            result = future.result()
+            if result is None:
+                raise _SearchTimeout()
+            curr_val, exact = result
+            scores[op] = curr_val
+            if not exact:
+                bounds[op] = curr_val
+            elif curr_val > alpha:
                 alpha = curr_val
                 operation = op
-            # if curr_val < beta:
-            #     beta = curr_val
+                self._iteration_best = op
+
+        for op, bound in bounds.items():
+            if bound < alpha:
+                continue
+            node = root.make_child(self._board, op)
+            try:
+                curr_val = - self.negamax(node, - INFINITY, - alpha)
+            finally:
+                self._board.unmake_move()
+            scores[op] = curr_val
+            if curr_val > alpha:
+                alpha = curr_val
+                operation = op
+                self._iteration_best = op
 
+        return operation, alpha, scores
 
-        return operation
+    def search_root_operator(self, board, op, turns, depth_limit, deadline, alpha):
+        """
+        search a single root operator on board, in a worker process of the parallel root search
+        :param deadline: wall clock time (time.time()) the search of the move has to end by
+        :return: (value, exact) of op, where a value that isn't exact is an upper bound of it (op failed
+        low against alpha), or None if the deadline passed first
+        """
+        if turns != self._search_turns:
+            # first task of a new move
+            self._search_turns = turns
+            self._table.new_search()
+            self._killers = []
+            self.age_history()
+        self._killers += [[] for _ in range(depth_limit + 1 - len(self._killers))]
+        self._board = board
+        self._depth_limit = depth_limit
+        self._deadline = time.perf_counter() + (deadline - time.time())
+
+        root = Node.make_root(board, self._color, turns)
+        try:
+            value = - self.negamax(root.make_child(board, op), - INFINITY, - alpha)
+        except _SearchTimeout:
+            return None
+        return value, value > alpha or alpha == - INFINITY
+
+    def scout(self, child, alpha, beta, full_window):
+        """
+        :param child: child of the node searched with the (alpha, beta) window, its move applied to the board
+        :param full_window: search the child with the window, like the first child of a node
+        :return: the value of child for the color to play at its parent. a child that isn't searched with
+        the full window gets a null window scout search first, and is searched with the window only
+        when it may be better than alpha.
+        """
+        if full_window:
+            return - self.negamax(child, - beta, - alpha)
+        value = - self.negamax(child, - alpha - 1, - alpha)
+        if alpha < value < beta:
+            value = - self.negamax(child, - beta, - value)
+        return value
+
+    def negamax(self, node, alpha, beta):
+        """
+        principal variation search of node in negamax form
+        :return: the value of node for the color to play at node
+        """
+        # also stops the first iteration, which falls back on the best operator it has searched
+        self.check_deadline()
+
+        stats = self._stats
+        if stats is not None:
+            stats.nodes += 1
 
+        if self._tablebase is not None:
+            value = self.probe_tablebase(node)
+            if value is not None:
+                if stats is not None:
+                    stats.tablebase_hits += 1
+                return value
 
-    def minimax_value(self, node, depth, is_maximizing_player, alpha, beta):
         if self.is_cut_off(node):
-            return self.get_place_eval(node)
+            return self.quiescence(node, alpha, beta)
+
+        # look the position up before expanding it
+        key = node.get_hash()
+        remaining_depth = self._depth_limit - node.get_depth()
+        alpha_orig, beta_orig = alpha, beta
+        entry = self._table.probe(key)
+        table_move = None
+        if entry is not None:
+            table_move = entry[4]
+            if node.is_mirrored():
+                # the entry is of the mirror image of the position
+                table_move = mirror_move(table_move)
+        if entry is not None and entry[1] >= remaining_depth:
+            bound, score = entry[2], entry[3]
+            if stats is not None:
+                stats.table_hits += 1
+            if bound == EXACT:
+                return score
+            elif bound == LOWER_BOUND:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if beta <= alpha:
+                return score
+
+        # children are built lazily, so the ones after a cutoff are never built
+        children = node.expand_successors(self._board, self.order_moves, table_move)
+        best_val = - INFINITY
+        best_move = None
+        cutoff_move = None
+        try:
+            for move, child in children:
+                # the first child is expected to be the best one, the others only need to be proven worse
+                value = self.scout(child, alpha, beta, best_val == - INFINITY)
+                if value > best_val:
+                    best_val, best_move = value, move
+                alpha = max(alpha, best_val)
+                if beta <= alpha:
+                    cutoff_move = move
+                    break
+        finally:
+            # takes back the move of the last child, also when the search is stopped by the deadline
+            children.close()
 
-        node.expand_successors()
+        if cutoff_move is not None:
+            self.record_cutoff(node, cutoff_move, remaining_depth)
+            if stats is not None:
+                stats.cutoff(node.get_depth())
 
-        list_maximizing_player = []
-        list_minimizing_player = []
+        if node.is_mirrored():
+            best_move = mirror_move(best_move)
+        self.store_in_table(key, remaining_depth, best_val, alpha_orig, beta_orig, best_move)
+        return best_val
 
-        for n in node.get_successors():
-            tup = (n, self.get_place_eval(n))
-            list_maximizing_player.append(tup)
-            list_minimizing_player.append(tup)
+    def quiescence(self, node, alpha, beta):
+        """
+        search below the cut-off only the actions that capture and the moves of threatened pieces, until
+        the position is quiet, so a node isn't evaluated in the middle of an exchange. the player to play
+        may also stand pat: keep the evaluation of the node instead of playing any of these actions.
+        """
+        stats = self._stats
+        if node.get_depth() > self._depth_limit:
+            self.check_deadline()
+            if stats is not None:
+                stats.nodes += 1
+        if stats is not None:
+            stats.leaves += 1
+
+        stand_pat = self.evaluate(node)
+        if node.get_depth() - self._depth_limit >= QUIESCENCE_DEPTH_LIMIT or stand_pat >= beta:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+
+        board = self._board
+        best_val = stand_pat
+        for move in self.get_quiescence_moves(node):
+            child = node.make_child(board, move)
+            try:
+                value = - self.quiescence(child, - beta, - alpha)
+            finally:
+                board.unmake_move()
+            best_val = max(best_val, value)
+            alpha = max(alpha, best_val)
+            if beta <= alpha:
+                break
+        return best_val
+
+    def get_quiescence_moves(self, node):
+        """
+        :return: the actions of the color to play searched by the quiescence search: its captures, then
+        in the moving phase the moves of its pieces the opponent threatens to capture
+        """
+        board = self._board
+        color = node.get_color()
+        moves = board.generate_capture_moves(color)
+        if board.get_is_place_phase():
+            return moves
+        threatened = board.get_threatened_pieces(color)
+        if threatened:
+            moves += [move for move in board.get_actions(color)
+                      if threatened >> move[0] & 1 and move not in moves]
+        return moves
+
+    def probe_tablebase(self, node):
+        """
+        :return: the exact value of the position of node for the color to play at node if it is in the endgame
+        tablebase, otherwise None. wins are worth more the sooner they come, and losses less
+        """
+        board = self._board
+        if board.get_is_place_phase() or \
+                not self._tablebase.covers(board.get_pieces_count('white'), board.get_pieces_count('black')):
+            return None
+        # the results of the tablebase don't go past the second shrink, so its positions are stored with
+        # their canonical hash even on the board shrunk once
+        entry = self._tablebase.probe(canonical_key(node.get_hash())[0], node.get_turns())
+        if entry is None:
+            return None
+        result, distance = entry
+        if result == WIN:
+            return TABLEBASE_WIN_SCORE - distance
+        if result == LOSS:
+            return distance - TABLEBASE_WIN_SCORE
+        return 0
+
+    def order_moves(self, node, moves):
+        """
+        sort the moves of a node so the ones most likely to cause a cutoff are searched first:
+        captures, killer moves of the ply, then the others by their history score.
+        (the best move stored in the transposition table is searched before all of them by
+        Node.expand_successors)
+        """
+        capture_moves = self._board.get_capture_moves(node.get_color(), moves)
+        killers = self._killers[node.get_depth()]
+        history = self._history
+        color = node.get_color()
 
+        def priority(move):
+            if move in capture_moves:
+                return CAPTURE_MOVE_PRIORITY
+            if move in killers:
+                return KILLER_MOVE_PRIORITY
+            return history.get((color, move), 0)
 
+        return sorted(moves, key=priority, reverse=True)
 
-        sorted(list_minimizing_player, key=itemgetter(1))
-        sorted(list_maximizing_player, key=itemgetter(1), reverse=True)
+    def record_cutoff(self, node, move, remaining_depth):
+        """
+        remember a quiet move that caused a cutoff, as a killer move of its ply and in the history table
+        """
+        if self._board.is_capture(node.get_color(), move):
+            return
+        killers = self._killers[node.get_depth()]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[KILLER_MOVES_PER_PLY:]
+        key = node.get_color(), move
+        self._history[key] = min(self._history.get(key, 0) + remaining_depth * remaining_depth,
+                                 KILLER_MOVE_PRIORITY - 1)
+
+    def age_history(self):
+        """
+        halve the history scores, so cutoffs of recent searches count more
+        """
+        self._history = {key: score // 2 for key, score in self._history.items() if score > 1}
 
-        if is_maximizing_player:
-            best_val = - INFINITY
-            for (child, rank) in list_maximizing_player:
-                value = self.minimax_value(child, depth+1, False, alpha, beta)
-                best_val = max(best_val, value)
-                alpha = max(alpha, best_val)
-                if beta <= alpha:
-                    break
-            return best_val
+    def store_in_table(self, key, depth, value, alpha, beta, best_move):
+        """
+        store the value of a searched position with the kind of bound the (alpha, beta) window gives it
+        """
+        if value <= alpha:
+            bound = UPPER_BOUND
+        elif value >= beta:
+            bound = LOWER_BOUND
         else:
-            best_val = INFINITY
-            for (child, rank) in list_minimizing_player:
-                value = self.minimax_value(child, depth+1, True, alpha, beta)
-                best_val = min(best_val, value)
-                beta = min(beta, best_val)
-                if beta <= alpha:
-                    break
-            return best_val
-
+            bound = EXACT
+        self._table.store(key, depth, bound, value, best_move)
 
-
-
-
-    def action(self, turns):
+    def action(self, turns, time_left=None):
         """
         This method is called by the referee to request an action by your player.
         :param turns: turns is an integer representing the number of turns that have
         taken place since the start of the current game phase
+        :param time_left: seconds left on the player's clock, when the referee keeps one
         :return: the next action of the player in a format of:
                  (x,y) -  placing a piece on square (x,y)
                  ((a,b),(c,d)) -  moving a piece from square (a,b) to square (c,d)
+                 None - forfeiting the turn when there is no move
         """
+        start = time.perf_counter()
+        if time_left is not None:
+            # the referee's clock is the one that counts
+            self._time_left = time_left
         self._board.check_shrink_board(turns)
+        # turns of the next action of the player, the moving phase counts its turns from 0
+        next_turns = turns + 2
+        if self._board.get_is_place_phase() and next_turns >= SUM_TURNS_PLACE_PHASE:
+            next_turns -= SUM_TURNS_PLACE_PHASE
+
+        # the search works on squares, the action is converted to the referee's coordinates once it is chosen
         if self._board.get_is_place_phase():
-            coords_list = self._board.get_empty_tiles(self._color)
-            coord = self.minimax_decision(coords_list, turns)
-            #coord = coords_list[random.randint(0, len(coords_list) - 1)]
-            row, col = coord[0], coord[1]
-            self._board.place_piece(self._color, (row, col))
-            return_val = col, row
+            squares_list = self._board.get_actions(self._color)
+            square = None
+            if self._book is not None:
+                square = self._book.lookup(self._board, self._color)
+            if square in squares_list:
+                # there is no search to go on from
+                self._completed_depth = 0
+            else:
+                square = self.minimax_decision(squares_list, turns)
+            #square = squares_list[random.randint(0, len(squares_list) - 1)]
+            self._board.place_piece(self._color, square_to_coord(square))
+            return_val = move_to_referee(square)
 
         else:
-            coords_list = self._board.get_available_moves(self._color)
-            coord = self.minimax_decision(coords_list, turns)
+            moves_list = self._board.get_actions(self._color)
+            move = self.minimax_decision(moves_list, turns)
 
-            #coord = coords_list[random.randint(0, len(coords_list) - 1)]
-            source, dest = coord[0], coord[1]
-            source_row, source_col, dest_row, dest_col = source[0], source[1], dest[0], dest[1]
+            #move = moves_list[random.randint(0, len(moves_list) - 1)]
+            if move is not None:
+                (source_row, source_col), (dest_row, dest_col) = square_to_coord(move[0]), square_to_coord(move[1])
 
-            self._board.move_piece(self._color, source_row, source_col, dest_row, dest_col)
+                self._board.move_piece(self._color, source_row, source_col, dest_row, dest_col)
 
-            return_val = (source_col, source_row), (dest_col, dest_row)
+            # None when there is no legal move
+            return_val = move_to_referee(move)
 
         self._board.check_update_phase(turns)
+        # the referee shrinks the board right after the action of the turn before a shrink
+        self._board.check_shrink_board(turns + 1)
+        self.predict_reply()
+        if self._ponder:
+            self.start_pondering(next_turns)
 
+        self._time_left -= time.perf_counter() - start
         return return_val
 
     def update(self, action):
@@ -202,8 +929,17 @@ class Player:
         :return:
         """
 
-        if not isinstance(action[0], tuple):
-            self._board.place_piece(self._opponent_color, (action[1], action[0]))
+        move = referee_to_move(action)
+        if move is not None:
+            self.apply_opponent_action(self._board, move)
+        self.check_reply(move)
+
+    def apply_opponent_action(self, board, move):
+        """
+        :param move: action of the opponent, in squares
+        """
+        if not isinstance(move, tuple):
+            board.place_piece(self._opponent_color, square_to_coord(move))
         else:
-            self._board.remove_piece(self._opponent_color, (action[0][1], action[0][0]))
-            self._board.place_piece(self._opponent_color, (action[1][1], action[1][0]))
+            board.remove_piece(self._opponent_color, square_to_coord(move[0]))
+            board.place_piece(self._opponent_color, square_to_coord(move[1]))
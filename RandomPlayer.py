@@ -64,6 +64,8 @@ class Player:
             return_val = (source_col, source_row), (dest_col, dest_row)
 
         self._board.check_update_phase(turns)
+        # the referee shrinks the board right after the action of the turn before a shrink
+        self._board.check_shrink_board(turns + 1)
 
         return return_val
 
@@ -71,10 +73,12 @@ class Player:
         """
         This method is called by the referee to inform your player about the opponent’s
         most recent move, so that you can maintain your internal board configuration.
-        :param action: representation of the opponent’s recent action
+        :param action: representation of the opponent’s recent action, None when it forfeited the turn
         :return:
         """
 
+        if action is None:
+            return
         if not isinstance(action[0], tuple):
             self._board.place_piece(self._opponent_color, (action[1], action[0]))
         else:
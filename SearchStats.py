@@ -0,0 +1,143 @@
+import json
+import time
+
+# board methods timed by the stats, by the part of the search they belong to
+TIMED_BOARD_METHODS = {'get_actions': 'move_generation',
+                       'make_move': 'make_unmake',
+                       'unmake_move': 'make_unmake',
+                       'is_capture': 'move_ordering',
+                       'get_capture_moves': 'move_ordering',
+                       'rank_pieces_loc': 'evaluation',
+                       'get_pieces_count': 'evaluation'}
+
+
+def _timed(method, times, part):
+    def timed(*args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            times[part] += time.perf_counter() - start
+    return timed
+
+
+class _TimedBoard:
+    """
+    Stands in for the board of the search while stats are collected, and adds the time of
+    every call of the methods of TIMED_BOARD_METHODS to the stats. other attributes are
+    the board's own.
+    The timed methods are wrapped once, when the board is wrapped, and the other methods are
+    kept on the first call, so a call costs one lookup like on the board itself.
+    """
+    def __init__(self, board, stats):
+        self._board = board
+        times = stats.get_part_times()
+        for name, part in TIMED_BOARD_METHODS.items():
+            setattr(self, name, _timed(getattr(board, name), times, part))
+
+    def get_board(self):
+        return self._board
+
+    def __getattr__(self, name):
+        # only called for the attributes that aren't set yet
+        attribute = getattr(self._board, name)
+        if callable(attribute):
+            setattr(self, name, attribute)
+        return attribute
+
+
+class SearchStats:
+    """
+    Collects what the search of every move does: nodes visited, leaves evaluated, cutoffs by ply,
+    searches of the root again after the value fell outside of the aspiration window, nodes and time
+    of every iteration of iterative deepening, and where the time went.
+    one JSON line per move is appended to the file, so the stats of many games can be
+    collected in one file and read line by line.
+    The counters cost little, but timing the calls of the board doubles the time of the search,
+    so where the time went is only measured with time_board.
+    """
+    def __init__(self, path, colour, time_board=False):
+        self._file = open(path, 'a')
+        self._colour = colour
+        self._time_board = time_board
+        # the timed board adds to this dictionary, so it is cleared in place for every move
+        self._part_times = {}
+        self._reset()
+
+    def _reset(self):
+        self._move_start = time.perf_counter()
+        self._iteration_start = self._move_start
+        self._iteration_nodes = 0
+        self._turns = None
+        self._operators = 0
+        self.nodes = 0
+        self.leaves = 0
+        self.table_hits = 0
+        self.tablebase_hits = 0
+        self.aspiration_researches = 0
+        self._cutoffs = []
+        self._iterations = []
+        for part in TIMED_BOARD_METHODS.values():
+            self._part_times[part] = 0.0
+
+    def get_part_times(self):
+        return self._part_times
+
+    def timed_board(self, board):
+        """
+        :return: board, with the time of its calls added to these stats when they time the board
+        """
+        if not self._time_board:
+            return board
+        return _TimedBoard(board, self)
+
+    def start_move(self, turns, operators):
+        self._reset()
+        self._turns = turns
+        self._operators = operators
+
+    def start_iteration(self):
+        self._iteration_start = time.perf_counter()
+        self._iteration_nodes = self.nodes
+
+    def end_iteration(self, depth, completed):
+        self._iterations.append({'depth': depth, 'completed': completed,
+                                 'nodes': self.nodes - self._iteration_nodes,
+                                 'time': time.perf_counter() - self._iteration_start})
+
+    def cutoff(self, ply):
+        while len(self._cutoffs) <= ply:
+            self._cutoffs.append(0)
+        self._cutoffs[ply] += 1
+
+    def effective_branching_factor(self):
+        """
+        :return: nodes of the last completed iteration divided by the nodes of the one before it,
+        or None when less than two iterations completed
+        """
+        completed = [iteration['nodes'] for iteration in self._iterations if iteration['completed']]
+        if len(completed) < 2 or completed[-2] == 0:
+            return None
+        return completed[-1] / completed[-2]
+
+    def end_move(self, move):
+        """
+        write the stats of the move searched since start_move
+        """
+        elapsed = time.perf_counter() - self._move_start
+        completed = [iteration['depth'] for iteration in self._iterations if iteration['completed']]
+        record = {'colour': self._colour, 'turns': self._turns, 'operators': self._operators,
+                  'move': move, 'depth': max(completed, default=0), 'time': elapsed,
+                  'nodes': self.nodes, 'leaves': self.leaves,
+                  'nps': self.nodes / elapsed if elapsed > 0 else 0.0,
+                  'table_hits': self.table_hits, 'tablebase_hits': self.tablebase_hits,
+                  'aspiration_researches': self.aspiration_researches,
+                  'cutoffs_by_ply': self._cutoffs,
+                  'effective_branching_factor': self.effective_branching_factor(),
+                  'iterations': self._iterations,
+                  'time_in': self._part_times if self._time_board else None}
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
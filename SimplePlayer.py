@@ -1,7 +1,6 @@
-from BoardState import BoardState
+from BoardState import BoardState, move_to_coords
 from Node import Node
 import random
-import copy
 
 CUT_OFF_DEPTH_LIMIT = 3
 
@@ -25,9 +24,9 @@ class Player:
 
     def get_place_eval(self, node):
 
-        white_eval = len(node.get_board().get_white_loc())
+        white_eval = len(self._board.get_white_loc())
         #print("white_eval "  + str(white_eval))
-        black_eval = len(node.get_board().get_black_loc())
+        black_eval = len(self._board.get_black_loc())
         #print("black_eval "  + str(black_eval))
         if self._color == 'white':
 
@@ -39,10 +38,10 @@ class Player:
     def get_eval(self, node):
         if self._color == 'white':
 
-            return len(node.get_board().get_white_loc()) - len(node.get_board().get_black_loc())
+            return len(self._board.get_white_loc()) - len(self._board.get_black_loc())
         else:
 
-            return len(node.get_board().get_black_loc()) - len(node.get_board().get_white_loc())
+            return len(self._board.get_black_loc()) - len(self._board.get_white_loc())
 
 
     def get_opponent_color(self):
@@ -94,25 +93,15 @@ class Player:
     #         return min(self.minimax_value(node) for node in node.get_successors())
 
     def minimax_decision(self, operators, turns):
-
         operation = operators[0]
         alpha = - INFINITY
         beta = INFINITY
 
+        root = Node.make_root(self._board, self._color, turns)
         for op in operators:
-            op_board = copy.deepcopy(self._board)
-            if op_board.get_is_place_phase():
-                row, col = op[0], op[1]
-                op_board.place_piece(self._color, (row, col))
-            else:
-                source, dest = op[0], op[1]
-                source_row, source_col, dest_row, dest_col = source[0], source[1], dest[0], dest[1]
-
-                op_board.move_piece(self._color, source_row, source_col, dest_row, dest_col)
-
-            node = Node(op_board, None, 1, self._opponent_color, turns+1)
-
+            node = root.make_child(self._board, op)
             curr_val = self.minimax_value(node, 0, False, alpha, beta)
+            self._board.unmake_move()
             if curr_val > alpha:
                 alpha = curr_val
                 operation = op
@@ -123,16 +112,14 @@ class Player:
 
 
     def minimax_value(self, node, depth, is_maximizing_player, alpha, beta):
-
         if self.is_cut_off(node):
             return self.get_place_eval(node)
 
-        node.expand_successors()
-
         if is_maximizing_player:
             best_val = - INFINITY
-            for child in node.get_successors():
-                value = self.minimax_value(child, depth+1, False, alpha, beta)
+            for move in node.expand_moves(self._board):
+                value = self.minimax_value(node.make_child(self._board, move), depth+1, False, alpha, beta)
+                self._board.unmake_move()
                 best_val = max(best_val, value)
                 alpha = max(alpha, best_val)
                 if beta <= alpha:
@@ -140,8 +127,9 @@ class Player:
             return best_val
         else:
             best_val = INFINITY
-            for child in node.get_successors():
-                value = self.minimax_value(child, depth+1, True, alpha, beta)
+            for move in node.expand_moves(self._board):
+                value = self.minimax_value(node.make_child(self._board, move), depth+1, True, alpha, beta)
+                self._board.unmake_move()
                 best_val = min(best_val, value)
                 beta = min(beta, best_val)
                 if beta <= alpha:
@@ -163,16 +151,15 @@ class Player:
         """
         self._board.check_shrink_board(turns)
         if self._board.get_is_place_phase():
-            coords_list = self._board.get_empty_tiles(self._color)
-            coord = self.minimax_decision(coords_list, turns)
+            # the search works on squares (see BoardState.move_to_referee)
+            coord = move_to_coords(self.minimax_decision(self._board.get_actions(self._color), turns))
             #coord = coords_list[random.randint(0, len(coords_list) - 1)]
             row, col = coord[0], coord[1]
             self._board.place_piece(self._color, (row, col))
             return_val = col, row
 
         else:
-            coords_list = self._board.get_available_moves(self._color)
-            coord = self.minimax_decision(coords_list, turns)
+            coord = move_to_coords(self.minimax_decision(self._board.get_actions(self._color), turns))
 
             #coord = coords_list[random.randint(0, len(coords_list) - 1)]
             source, dest = coord[0], coord[1]
@@ -183,6 +170,8 @@ class Player:
             return_val = (source_col, source_row), (dest_col, dest_row)
 
         self._board.check_update_phase(turns)
+        # the referee shrinks the board right after the action of the turn before a shrink
+        self._board.check_shrink_board(turns + 1)
 
         return return_val
 
@@ -190,10 +179,12 @@ class Player:
         """
         This method is called by the referee to inform your player about the opponent’s
         most recent move, so that you can maintain your internal board configuration.
-        :param action: representation of the opponent’s recent action
+        :param action: representation of the opponent’s recent action, None when it forfeited the turn
         :return:
         """
 
+        if action is None:
+            return
         if not isinstance(action[0], tuple):
             self._board.place_piece(self._opponent_color, (action[1], action[0]))
         else:
@@ -0,0 +1,114 @@
+import mmap
+import os
+import struct
+
+from BoardState import SECOND_BOARD_SHRINK
+
+# first bytes of a tablebase file, changed whenever the meaning of the records changes
+TABLEBASE_MAGIC = b'WYBTB002'
+
+# first bytes of the tablebase files of older formats: raw (not canonical) hashes
+OLD_TABLEBASE_MAGICS = (b'WYBTB001',)
+
+# after the magic: number of slots (a power of two) and the most pieces a color has in the tables
+TABLEBASE_HEADER = struct.Struct('<IB')
+
+# one record per slot: Zobrist hash of the position (0 for an empty slot) and its result.
+# the slot of a position is its hash masked by the number of slots, or the next ones when taken
+TABLEBASE_RECORD = struct.Struct('<QH')
+
+# result of the color to play, kept in the top 2 bits of a record, the distance in the others
+WIN = 1
+LOSS = 2
+DRAW = 3
+RESULT_SHIFT = 14
+MAX_DISTANCE = (1 << RESULT_SHIFT) - 1
+
+
+def write_tablebase(path, results, max_pieces):
+    """
+    :param results: dictionary of position hash to (result, distance in plies to the end of the game)
+    :param max_pieces: the most pieces a color has in the positions of results
+    """
+    size = 1
+    while size < 2 * len(results):
+        size <<= 1
+    slots = [None] * size
+    for key, (result, distance) in results.items():
+        index = key & (size - 1)
+        while slots[index] is not None:
+            index = (index + 1) & (size - 1)
+        slots[index] = (key, result << RESULT_SHIFT | min(distance, MAX_DISTANCE))
+
+    with open(path, 'wb') as f:
+        f.write(TABLEBASE_MAGIC)
+        f.write(TABLEBASE_HEADER.pack(size, max_pieces))
+        empty = TABLEBASE_RECORD.pack(0, 0)
+        for slot in slots:
+            f.write(empty if slot is None else TABLEBASE_RECORD.pack(*slot))
+
+
+class Tablebase:
+    """
+    Read only endgame tablebase of the shrunk boards, written by build_tablebase.py.
+    It holds the result of every position of the moving phase on the 6x6 and 4x4 boards
+    where no color has more than max_pieces pieces, with the number of plies to the end of
+    the game under perfect play. The file is memory mapped and every probe reads one slot
+    (or a few, past a collision) of an open addressing hash table.
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic = self._map[:len(TABLEBASE_MAGIC)]
+        if magic != TABLEBASE_MAGIC:
+            self._map.close()
+            if magic in OLD_TABLEBASE_MAGICS:
+                raise ValueError(path + ' is a tablebase of an older format, build it again with build_tablebase.py')
+            raise ValueError(path + ' is not a tablebase')
+        self._size, self._max_pieces = TABLEBASE_HEADER.unpack_from(self._map, len(TABLEBASE_MAGIC))
+        self._records_start = len(TABLEBASE_MAGIC) + TABLEBASE_HEADER.size
+
+    @classmethod
+    def load(cls, path):
+        """
+        :return: the tablebase of path, or None if there is no such file
+        """
+        if not os.path.exists(path):
+            return None
+        return cls(path)
+
+    def get_max_pieces(self):
+        return self._max_pieces
+
+    def covers(self, white_count, black_count):
+        """
+        :return: True iff positions with these numbers of pieces may be in the tables
+        """
+        return white_count <= self._max_pieces and black_count <= self._max_pieces
+
+    def probe(self, key, turns):
+        """
+        :param key: canonical Zobrist hash of a moving phase position, with the color to play
+        :param turns: turns of the moving phase played so far
+        :return: (result, distance) of the color to play, or None if the position isn't in the tables.
+        The tables of the 6x6 board are built as if it never shrank again, so their results are only
+        returned when the game ends before the second shrink.
+        """
+        mask = self._size - 1
+        index = key & mask
+        while True:
+            record_key, value = TABLEBASE_RECORD.unpack_from(self._map,
+                                                             self._records_start + index * TABLEBASE_RECORD.size)
+            if record_key == key:
+                break
+            if record_key == 0:
+                return None
+            index = (index + 1) & mask
+
+        result, distance = value >> RESULT_SHIFT, value & MAX_DISTANCE
+        if turns < SECOND_BOARD_SHRINK and (result == DRAW or turns + distance > SECOND_BOARD_SHRINK):
+            return None
+        return result, distance
+
+    def close(self):
+        self._map.close()
@@ -0,0 +1,56 @@
+import threading
+
+# bound types of a stored score
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+
+class TranspositionTable:
+    """
+    Fixed size hash table of searched positions, indexed by the Zobrist hash of the board.
+    each entry holds (hash, depth, bound type, score, best move, search generation).
+    An entry is replaced when the slot is empty, holds the same position, was stored by an
+    older search, or was searched less deep than the new entry.
+    A table shared by the searches of several threads is thread safe: entries are immutable
+    tuples, so a probe reads a whole entry, and stores are made under a lock.
+    """
+    def __init__(self, size, thread_safe=False):
+        # size is rounded down to a power of two so a slot is found with a mask
+        self._mask = (1 << (size.bit_length() - 1)) - 1
+        self._entries = [None] * (self._mask + 1)
+        self._generation = 0
+        self._lock = None
+        if thread_safe:
+            self._lock = threading.Lock()
+
+    def new_search(self):
+        """
+        called once per move, so entries of older searches are replaced first
+        """
+        self._generation += 1
+
+    def probe(self, key):
+        """
+        :return: the entry (hash, depth, bound type, score, best move, generation) of the position, or None
+        """
+        entry = self._entries[key & self._mask]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, bound, score, best_move):
+        if self._lock is None:
+            self._store(key, depth, bound, score, best_move)
+        else:
+            with self._lock:
+                self._store(key, depth, bound, score, best_move)
+
+    def _store(self, key, depth, bound, score, best_move):
+        index = key & self._mask
+        entry = self._entries[index]
+        if entry is None or entry[0] == key or entry[5] != self._generation or depth >= entry[1]:
+            self._entries[index] = (key, depth, bound, score, best_move, self._generation)
+
+    def clear(self):
+        self._entries = [None] * (self._mask + 1)
@@ -0,0 +1,69 @@
+import random
+
+# random 64-bit keys for Zobrist hashing of board states.
+# a fixed seed keeps the hashes the same in every process and every run
+_random = random.Random(30024)
+
+# number of columns of the board, a square is mirrored left-right to column BOARD_COLUMNS - 1 - col
+BOARD_COLUMNS = 8
+
+LOW_HALF_MASK = (1 << 32) - 1
+
+
+def _random_key():
+    return _random.getrandbits(64)
+
+
+def _symmetric_key():
+    # a key with equal halves, which mirror_key leaves as it is
+    half = _random.getrandbits(32)
+    return half << 32 | half
+
+
+def mirror_key(key):
+    """
+    :return: the hash of the state reflected left-right, for the hash key of a state.
+    the key of a piece on a square is the key of the piece on the mirrored square with its two
+    halves swapped, and the other keys have equal halves, so swapping the halves of a hash mirrors it.
+    """
+    return (key & LOW_HALF_MASK) << 32 | key >> 32
+
+
+def canonical_key(key):
+    """
+    :return: the smaller of the hash key of a state and the hash of its mirror image, the same for
+    both states, and True iff it is the hash of the mirror image
+    """
+    mirrored = mirror_key(key)
+    if mirrored < key:
+        return mirrored, True
+    return key, False
+
+
+def _piece_keys():
+    keys = [None] * 64
+    for row in range(BOARD_COLUMNS):
+        for col in range(BOARD_COLUMNS // 2):
+            keys[row * 8 + col] = _random_key()
+            keys[row * 8 + BOARD_COLUMNS - 1 - col] = mirror_key(keys[row * 8 + col])
+    return keys
+
+
+# PIECE_KEYS[color][row * 8 + col]
+PIECE_KEYS = {'white': _piece_keys(),
+              'black': _piece_keys()}
+
+# xor-ed in while the board is in the placing phase
+PLACE_PHASE_KEY = _symmetric_key()
+
+# SHRINK_KEYS[number of shrinks]
+SHRINK_KEYS = [_symmetric_key() for _ in range(3)]
+
+# xor-ed in when black is the color to play
+BLACK_TO_PLAY_KEY = _symmetric_key()
+
+
+def side_key(color):
+    if color == 'black':
+        return BLACK_TO_PLAY_KEY
+    return 0
@@ -0,0 +1,127 @@
+# Opening book builder for Watch Your Back!
+# Searches the positions of the first placing turns deeply, offline, and writes
+# the best placement of each to a binary book that Player reads during games.
+
+import time
+import argparse
+
+from Player import Player, BOOK_PATH, INFINITY
+from BoardState import mirror_move
+from OpeningBook import write_book
+
+VERSION_INFO = """Opening book builder
+Searches the first turns of the placing phase of Watch Your Back! deeply
+Run `python build_book.py -h` for help and additional usage information
+"""
+
+def main():
+    """Build the book of both colours and write it."""
+    options = _Options()
+    print(VERSION_INFO)
+
+    start = time.perf_counter()
+    book = {}
+    for colour in ('white', 'black'):
+        _build(colour, options.plies, options.depth, options.time, book)
+        print(f"{colour}: {len(book)} positions so far "
+              f"({time.perf_counter() - start:.1f}s)")
+
+    write_book(options.output, book)
+    print(f"wrote {len(book)} positions to {options.output}")
+
+# --------------------------------------------------------------------------- #
+
+# OPTIONS
+
+# default values (to use if flag is not provided)
+PLIES_DEFAULT = 4
+DEPTH_DEFAULT = 4
+
+
+class _Options:
+    """
+    Parse and contain command-line arguments.
+
+    --- help message: ---
+    usage: build_book.py [-h] [-p PLIES] [-d DEPTH] [-t TIME] [-o OUTPUT]
+
+    Builds the opening book of the placing phase of Watch Your Back!
+
+    optional arguments:
+      -h, --help            show this help message and exit
+      -p PLIES, --plies PLIES
+                            number of placing turns covered by the book
+      -d DEPTH, --depth DEPTH
+                            search depth of every book position
+      -t TIME, --time TIME  seconds to search every book position (default: no
+                            limit)
+      -o OUTPUT, --output OUTPUT
+                            file to write the book to
+    ---------------------
+    """
+    def __init__(self):
+        parser = argparse.ArgumentParser(
+                description="Builds the opening book of the placing phase of "
+                    "Watch Your Back!")
+        parser.add_argument('-p', '--plies', type=int, default=PLIES_DEFAULT,
+                help="number of placing turns covered by the book")
+        parser.add_argument('-d', '--depth', type=int, default=DEPTH_DEFAULT,
+                help="search depth of every book position")
+        parser.add_argument('-t', '--time', type=float, default=INFINITY,
+                help="seconds to search every book position (default: no "
+                    "limit)")
+        parser.add_argument('-o', '--output', default=BOOK_PATH,
+                help="file to write the book to")
+
+        args = parser.parse_args()
+        self.plies = args.plies
+        self.depth = args.depth
+        self.time = args.time
+        self.output = args.output
+
+# --------------------------------------------------------------------------- #
+
+# BUILDING
+
+def _build(colour, plies, depth, time_budget, book):
+    """
+    Add the positions of colour to play in the first plies turns to the book.
+    Every placement of the opponent is followed, but only the book placement of
+    colour, so the book covers every position a game can reach while colour
+    plays by the book. A position is skipped when it or its mirror image is
+    already in the book, they have the same canonical hash.
+
+    :param book: dictionary of canonical position hash to placement, updated
+    in place
+    """
+    player = Player(colour, book_path=None)
+    _explore(player, player.get_board(), 'white', 0, plies, depth, time_budget,
+             book, set())
+
+def _explore(player, board, colour, turns, plies, depth, time_budget, book,
+             seen):
+    if turns >= plies:
+        return
+    key, mirrored = board.get_canonical_hash(colour)
+    if key in seen:
+        return
+    seen.add(key)
+
+    placements = board.get_actions(colour)
+    if colour == player.get_color():
+        move = player.minimax_decision(placements, turns, depth, time_budget)
+        # the book placement is the one of the board of the canonical hash
+        book[key] = mirror_move(move) if mirrored else move
+        placements = [move]
+
+    next_colour = board.get_opposite_color(colour)
+    for placement in placements:
+        board.make_move(colour, placement, turns)
+        _explore(player, board, next_colour, turns + 1, plies, depth,
+                 time_budget, book, seen)
+        board.unmake_move()
+
+# --------------------------------------------------------------------------- #
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,277 @@
+# Endgame tablebase builder for Watch Your Back!
+# Solves every position of the moving phase with few pieces on the shrunk
+# boards by retrograde analysis, and writes the results to a file that Player
+# probes during its search.
+
+import time
+import argparse
+import itertools
+from collections import deque
+
+from Player import TABLEBASE_PATH
+from BitBoardState import VALID_MASKS, CORNER_MASKS, SHIFTS, shift_left, \
+    shift_up, shift_right, shift_down, popcount
+from Zobrist import PIECE_KEYS, SHRINK_KEYS, side_key, canonical_key
+from Tablebase import WIN, LOSS, DRAW, write_tablebase
+
+VERSION_INFO = """Tablebase builder
+Solves the endgames of Watch Your Back! on the 6x6 and 4x4 boards
+Run `python build_tablebase.py -h` for help and additional usage information
+"""
+
+# shrink level of the last board, the game can't change after it, so its
+# draws are real draws
+FINAL_LEVEL = 2
+
+def main():
+    """Solve the endgames of both shrunk boards and write them to one file."""
+    options = _Options()
+    print(VERSION_INFO)
+
+    results = {}
+    for level, max_pieces in ((1, options.pieces_6x6), (2, options.pieces_4x4)):
+        start = time.perf_counter()
+        solved = _solve(level, max_pieces)
+        print(f"level {level}: {len(solved)} positions, "
+              f"{sum(r == WIN for r, _ in solved.values())} wins, "
+              f"{sum(r == LOSS for r, _ in solved.values())} losses "
+              f"({time.perf_counter() - start:.1f}s)")
+        results.update(solved)
+
+    write_tablebase(options.output, results,
+                    max(options.pieces_6x6, options.pieces_4x4))
+    print(f"wrote {len(results)} positions to {options.output}")
+
+# --------------------------------------------------------------------------- #
+
+# OPTIONS
+
+# default values (to use if flag is not provided)
+PIECES_6X6_DEFAULT = 2
+PIECES_4X4_DEFAULT = 3
+
+
+class _Options:
+    """
+    Parse and contain command-line arguments.
+
+    --- help message: ---
+    usage: build_tablebase.py [-h] [--pieces-6x6 N] [--pieces-4x4 N]
+                              [-o OUTPUT]
+
+    Solves the endgames of Watch Your Back! on the 6x6 and 4x4 boards
+
+    optional arguments:
+      -h, --help        show this help message and exit
+      --pieces-6x6 N    most pieces of a colour in the 6x6 tables
+      --pieces-4x4 N    most pieces of a colour in the 4x4 tables
+      -o OUTPUT, --output OUTPUT
+                        file to write the tablebase to
+    ---------------------
+    """
+    def __init__(self):
+        parser = argparse.ArgumentParser(
+                description="Solves the endgames of Watch Your Back! on the "
+                    "6x6 and 4x4 boards")
+        parser.add_argument('--pieces-6x6', type=int, metavar='N',
+                default=PIECES_6X6_DEFAULT,
+                help="most pieces of a colour in the 6x6 tables")
+        parser.add_argument('--pieces-4x4', type=int, metavar='N',
+                default=PIECES_4X4_DEFAULT,
+                help="most pieces of a colour in the 4x4 tables")
+        parser.add_argument('-o', '--output', default=TABLEBASE_PATH,
+                help="file to write the tablebase to")
+
+        args = parser.parse_args()
+        if min(args.pieces_6x6, args.pieces_4x4) < 2:
+            parser.error("the tables need at least 2 pieces of a colour")
+        self.pieces_6x6 = args.pieces_6x6
+        self.pieces_4x4 = args.pieces_4x4
+        self.output = args.output
+
+# --------------------------------------------------------------------------- #
+
+# SOLVING
+
+def _solve(level, max_pieces):
+    """
+    Retrograde analysis of every position on the board of level (number of
+    shrinks) where both colours have 2 to max_pieces pieces.
+
+    The successors of every position are generated once and inverted into
+    predecessor lists. Starting from the positions decided by a single move,
+    results are then propagated backwards one ply at a time: a predecessor of a
+    lost position is won, and a position whose successors are all won for the
+    opponent is lost. Positions never reached this way are draws.
+
+    :return: dictionary of position hash to (result of the colour to play,
+    distance in plies to the end of the game)
+    """
+    squares = [sq for sq in range(64)
+               if (VALID_MASKS[level] & ~CORNER_MASKS[level]) >> sq & 1]
+    positions = []
+    for n_white in range(2, max_pieces + 1):
+        for white in itertools.combinations(squares, n_white):
+            rest = [sq for sq in squares if sq not in white]
+            for n_black in range(2, max_pieces + 1):
+                for black in itertools.combinations(rest, n_black):
+                    white_mask = sum(1 << sq for sq in white)
+                    black_mask = sum(1 << sq for sq in black)
+                    positions.append((white_mask, black_mask, 'white'))
+                    positions.append((white_mask, black_mask, 'black'))
+    index = {position: i for i, position in enumerate(positions)}
+
+    result = [None] * len(positions)
+    distance = [0] * len(positions)
+    # successors not known to be won for the opponent yet
+    remaining = [0] * len(positions)
+    # longest game among the successors known to be won for the opponent
+    loss_distance = [0] * len(positions)
+    has_draw = [False] * len(positions)
+    predecessors = [[] for _ in positions]
+    queue = deque()
+
+    for i, position in enumerate(positions):
+        successors = set()
+        for outcome, successor in _successors(level, *position):
+            if outcome == WIN:
+                result[i], distance[i] = WIN, 1
+            elif outcome == LOSS:
+                loss_distance[i] = 1
+            elif outcome == DRAW:
+                has_draw[i] = True
+            else:
+                successors.add(index[successor])
+        if result[i] == WIN:
+            queue.append(i)
+            continue
+        remaining[i] = len(successors)
+        for j in successors:
+            predecessors[j].append(i)
+        if remaining[i] == 0 and not has_draw[i]:
+            result[i], distance[i] = LOSS, loss_distance[i]
+            queue.append(i)
+
+    while queue:
+        i = queue.popleft()
+        for j in predecessors[i]:
+            if result[j] is not None:
+                continue
+            if result[i] == LOSS:
+                result[j], distance[j] = WIN, distance[i] + 1
+                queue.append(j)
+            else:
+                remaining[j] -= 1
+                loss_distance[j] = max(loss_distance[j], distance[i] + 1)
+                if remaining[j] == 0 and not has_draw[j]:
+                    result[j], distance[j] = LOSS, loss_distance[j]
+                    queue.append(j)
+
+    solved = {}
+    for i, (white, black, colour) in enumerate(positions):
+        if result[i] is None:
+            # the board of a draw may still shrink, it isn't a draw then
+            if level != FINAL_LEVEL:
+                continue
+            result[i] = DRAW
+        solved[_hash(level, white, black, colour)] = (result[i], distance[i])
+    return solved
+
+def _successors(level, white, black, colour):
+    """
+    Generate the positions after every move of colour, like
+    BitBoardState.make_move. A colour with no move forfeits its turn.
+
+    :return: generator of (outcome, position) pairs: outcome is WIN, LOSS or
+    DRAW for colour when the move ends the game (position is None then), and
+    None otherwise
+    """
+    if colour == 'white':
+        own, enemy, next_colour = white, black, 'black'
+    else:
+        own, enemy, next_colour = black, white, 'white'
+    corners = CORNER_MASKS[level]
+    empty = VALID_MASKS[level] & ~(white | black | corners)
+
+    moved = False
+    for shift in SHIFTS:
+        pieces = own
+        while pieces:
+            source = pieces & -pieces
+            pieces ^= source
+            dest = shift(source)
+            if not dest & empty:
+                if not dest & (white | black):
+                    continue
+                dest = shift(dest)
+                if not dest & empty:
+                    continue
+            moved = True
+            new_own, new_enemy = _eliminate_about(own ^ source ^ dest, enemy,
+                                                  corners, dest)
+            outcome = _outcome(popcount(new_own), popcount(new_enemy))
+            if outcome is not None:
+                yield outcome, None
+            else:
+                yield None, _position(colour, new_own, new_enemy, next_colour)
+
+    if not moved:
+        yield None, (white, black, next_colour)
+
+def _eliminate_about(own, enemy, corners, bit):
+    """
+    A piece has entered the square of bit: remove the enemy pieces it
+    surrounds, then the piece itself if it is surrounded, like
+    BitBoardState._eliminate_about.
+
+    :return: the own and enemy masks after the captures
+    """
+    allies = own | corners
+    for shift in SHIFTS:
+        target = shift(bit) & enemy
+        if target and shift(target) & allies:
+            enemy ^= target
+
+    hostile = enemy | corners
+    if (shift_left(bit) & hostile and shift_right(bit) & hostile) or \
+            (shift_up(bit) & hostile and shift_down(bit) & hostile):
+        own ^= bit
+    return own, enemy
+
+def _outcome(n_own, n_enemy):
+    """
+    :return: the result of the game for the colour that just moved, like the
+    referee's _check_win, or None if the game goes on
+    """
+    if n_own >= 2 and n_enemy >= 2:
+        return None
+    if n_own < 2 and n_enemy < 2:
+        return DRAW
+    if n_enemy < 2:
+        return WIN
+    return LOSS
+
+def _position(colour, own, enemy, next_colour):
+    if colour == 'white':
+        return own, enemy, next_colour
+    return enemy, own, next_colour
+
+def _hash(level, white, black, colour):
+    """
+    :return: the canonical Zobrist hash (Zobrist.canonical_key) of the position
+    in the moving phase, which Player probes the tablebase with. a position and
+    its mirror image share one entry, the results stop at the second shrink
+    """
+    key = SHRINK_KEYS[level] ^ side_key(colour)
+    for keys, mask in ((PIECE_KEYS['white'], white),
+                       (PIECE_KEYS['black'], black)):
+        while mask:
+            low = mask & -mask
+            key ^= keys[low.bit_length() - 1]
+            mask ^= low
+    return canonical_key(key)[0]
+
+# --------------------------------------------------------------------------- #
+
+if __name__ == '__main__':
+    main()
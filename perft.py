@@ -0,0 +1,291 @@
+# Perft for Watch Your Back!
+# Counts the leaves of the game tree to a fixed depth with the move generation
+# of BoardState (or BitBoardState), and can check every node of the tree
+# against the referee's game state.
+
+import sys
+import time
+import random
+import argparse
+
+from referee import _Game, _InvalidActionException
+from BoardState import BoardState, SUM_TURNS_PLACE_PHASE, move_to_referee, referee_to_move
+from BitBoardState import BitBoardState
+
+VERSION_INFO = """Perft
+Counts the game tree of Watch Your Back! to a fixed depth
+Run `python perft.py -h` for help and additional usage information
+"""
+
+def main():
+    """Count the tree of every position, and report counts and timing."""
+    options = _Options()
+    print(VERSION_INFO)
+
+    rng = random.Random(options.seed)
+    total_leaves = 0
+    total_time = 0.0
+    for i in range(options.positions):
+        game, actions = _random_position(options.turns, rng)
+        board = _replay(actions, options.bitboard)
+        check_game = game if options.check else None
+
+        start = time.perf_counter()
+        try:
+            leaves = _perft(board, game.turns, options.depth, check_game)
+        except _DivergenceException as e:
+            print(f"position {i}: {e}")
+            print(game)
+            sys.exit(1)
+        elapsed = time.perf_counter() - start
+
+        total_leaves += leaves
+        total_time += elapsed
+        print(f"position {i} ({game.phase} turn {game.turns}): depth "
+              f"{options.depth}: {leaves} leaves in {elapsed:.3f}s")
+
+    rate = total_leaves / total_time if total_time > 0 else 0.0
+    print(f"total: {total_leaves} leaves in {total_time:.3f}s "
+          f"({rate:.0f} leaves/s)")
+
+# --------------------------------------------------------------------------- #
+
+# OPTIONS
+
+# default values (to use if flag is not provided)
+DEPTH_DEFAULT = 3
+TURNS_DEFAULT = 0
+POSITIONS_DEFAULT = 1
+SEED_DEFAULT = 0
+
+
+class _Options:
+    """
+    Parse and contain command-line arguments.
+
+    --- help message: ---
+    usage: perft.py [-h] [-d DEPTH] [-t TURNS] [-n POSITIONS] [-s SEED] [-c]
+                    [-b]
+
+    Counts the game tree of Watch Your Back! to a fixed depth
+
+    optional arguments:
+      -h, --help            show this help message and exit
+      -d DEPTH, --depth DEPTH
+                            plies to count the tree to
+      -t TURNS, --turns TURNS
+                            random actions played from the start of the game
+                            to reach every position (0 for the start position)
+      -n POSITIONS, --positions POSITIONS
+                            number of positions to count
+      -s SEED, --seed SEED  seed of the random actions
+      -c, --check           check the actions and the board of every node
+                            against the referee
+      -b, --bitboard        count with BitBoardState instead of BoardState
+    ---------------------
+    """
+    def __init__(self):
+        parser = argparse.ArgumentParser(
+                description="Counts the game tree of Watch Your Back! to a "
+                    "fixed depth")
+        parser.add_argument('-d', '--depth', type=int, default=DEPTH_DEFAULT,
+                help="plies to count the tree to")
+        parser.add_argument('-t', '--turns', type=int, default=TURNS_DEFAULT,
+                help="random actions played from the start of the game to "
+                    "reach every position (0 for the start position)")
+        parser.add_argument('-n', '--positions', type=int,
+                default=POSITIONS_DEFAULT,
+                help="number of positions to count")
+        parser.add_argument('-s', '--seed', type=int, default=SEED_DEFAULT,
+                help="seed of the random actions")
+        parser.add_argument('-c', '--check', action='store_true',
+                help="check the actions and the board of every node against "
+                    "the referee")
+        parser.add_argument('-b', '--bitboard', action='store_true',
+                help="count with BitBoardState instead of BoardState")
+
+        args = parser.parse_args()
+        self.depth = args.depth
+        self.turns = args.turns
+        self.positions = args.positions
+        self.seed = args.seed
+        self.check = args.check
+        self.bitboard = args.bitboard
+
+# --------------------------------------------------------------------------- #
+
+# COUNTING
+
+class _DivergenceException(Exception):
+    """For when the board disagrees with the referee"""
+
+def _perft(board, turns, depth, game=None):
+    """
+    Count the leaves of the game tree below the position of board.
+    Completed games are not counted, and a player with no move forfeits its
+    turn (the None action), like in the referee.
+
+    :param turns: turns of the current phase played so far
+    :param game: the referee's _Game in the same position, to check every
+    node against (None to only count)
+    :return: number of positions depth plies below the position of board
+    """
+    if depth == 0:
+        return 1
+
+    colour = 'white' if turns % 2 == 0 else 'black'
+    # the actions of the board are in squares, like the search keeps them
+    if board.get_is_place_phase():
+        moves = board.get_actions(colour)
+    else:
+        moves = board.get_actions(colour) or [None]
+
+    children = None
+    if game is not None:
+        children = _check_actions(board, colour, moves, game)
+
+    if board.get_is_place_phase() and turns == SUM_TURNS_PLACE_PHASE - 1:
+        next_turns = 0
+    else:
+        next_turns = turns + 1
+
+    leaves = 0
+    for move in moves:
+        board.make_move(colour, move, turns)
+        child = None
+        if children is not None:
+            child = children[move]
+            _check_board(board, move, child)
+        if not _completed(board):
+            leaves += _perft(board, next_turns, depth - 1, child)
+        board.unmake_move()
+    return leaves
+
+def _completed(board):
+    """:return: True iff the game is over, like the referee's _check_win"""
+    if board.get_is_place_phase():
+        return False
+    return board.get_pieces_count('white') < 2 or \
+        board.get_pieces_count('black') < 2
+
+# --------------------------------------------------------------------------- #
+
+# CHECKING AGAINST THE REFEREE
+
+def _copy_game(game):
+    copy = _Game.__new__(_Game)
+    copy.__dict__.update(game.__dict__)
+    copy.board = [row[:] for row in game.board]
+    copy.pieces = dict(game.pieces)
+    return copy
+
+def _referee_actions(game):
+    """
+    Find the legal actions of the player to play by trying every action that
+    could be legal on a copy of the game, so the referee validates them.
+
+    :return: dictionary of every legal action, in the referee's (x, y)
+    coordinates, to the game after it
+    """
+    if game.phase == 'placing':
+        candidates = [(x, y) for y in range(8) for x in range(8)]
+    else:
+        candidates = []
+        for xa, ya in game._squares_with_piece(game._piece()):
+            for dx, dy in [(-1, 0), (0, -1), (1, 0), (0, 1)]:
+                for distance in (1, 2):
+                    candidates.append(((xa, ya), (xa + distance * dx,
+                                                  ya + distance * dy)))
+
+    actions = {}
+    for action in candidates:
+        child = _copy_game(game)
+        try:
+            child.update(action)
+        except _InvalidActionException:
+            continue
+        actions[action] = child
+
+    if not actions and game.phase == 'moving':
+        child = _copy_game(game)
+        child.update(None)
+        actions[None] = child
+    return actions
+
+def _check_actions(board, colour, moves, game):
+    """
+    :return: dictionary of every move of board to the referee's game after it
+    :raises _DivergenceException: when the moves of the board aren't exactly
+    the legal actions of the referee
+    """
+    actions = _referee_actions(game)
+    by_move = {move: move_to_referee(move) for move in moves}
+    missing = set(actions) - set(by_move.values())
+    illegal = set(by_move.values()) - set(actions)
+    if missing or illegal or len(moves) != len(set(moves)):
+        raise _DivergenceException(
+            f"actions of {colour} differ from the referee's: missing "
+            f"{sorted(missing, key=str)}, illegal {sorted(illegal, key=str)}")
+    return {move: actions[action] for move, action in by_move.items()}
+
+def _check_board(board, move, game):
+    """
+    :raises _DivergenceException: when the board after move isn't the
+    referee's board
+    """
+    if _completed(board) == game.playing():
+        raise _DivergenceException(f"after {move}, the game is "
+            f"{'over' if _completed(board) else 'not over'} on the board "
+            f"but the referee's game is {game.phase}")
+    if not game.playing():
+        # the referee doesn't shrink the board of a completed game
+        return
+
+    pieces = (sorted(board.get_white_loc()), sorted(board.get_black_loc()))
+    expected = tuple(sorted((y, x) for x, y in game._squares_with_piece(piece))
+                     for piece in ('W', 'B'))
+    if pieces != expected or board.get_shrink_level() != game.n_shrinks or \
+            board.get_is_place_phase() != (game.phase == 'placing'):
+        raise _DivergenceException(f"after {move}, the board has pieces "
+            f"{pieces} and {board.get_shrink_level()} shrinks, the referee "
+            f"has {expected} and {game.n_shrinks} shrinks")
+
+# --------------------------------------------------------------------------- #
+
+# POSITIONS
+
+def _random_position(n_actions, rng):
+    """
+    Play uniformly random legal actions from the start of the game.
+
+    :return: the referee's game after them (or before the action that would
+    have completed it), and the list of actions
+    """
+    game = _Game()
+    actions = []
+    for _ in range(n_actions):
+        legal = _referee_actions(game)
+        action = rng.choice(sorted(legal, key=str))
+        if not legal[action].playing():
+            break
+        game = legal[action]
+        actions.append(action)
+    return game, actions
+
+def _replay(actions, bitboard):
+    """:return: a board after the actions of the referee's game"""
+    if bitboard:
+        board = BitBoardState()
+    else:
+        board = BoardState()
+    game = _Game()
+    for action in actions:
+        colour = 'white' if game.turns % 2 == 0 else 'black'
+        board.make_move(colour, referee_to_move(action), game.turns)
+        game.update(action)
+    return board
+
+# --------------------------------------------------------------------------- #
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,7 @@
 # version: v1.0
 
 import time
+import inspect
 import argparse
 import importlib
 
@@ -18,32 +19,56 @@ def main():
     options = _Options()
     print(VERSION_INFO)
 
+    # stream the game to the record file
+    record = None
+    if options.record is not None:
+        from GameRecord import GameRecordWriter
+        record = GameRecordWriter(options.record)
+        record.start_game(options.white_module, options.black_module)
+
     # initialise the game and players
     game  = _Game()
-    white = _Player(options.white_player, 'white')
-    black = _Player(options.black_player, 'black')
+    white = _Player(options.white_player, 'white', options.time,
+                    options.increment)
+    black = _Player(options.black_player, 'black', options.time,
+                    options.increment)
 
     # now, play the game!
     player, opponent = white, black # white has first move
+    end_reason = None
     print(game)
     while game.playing():
         if options.delay:
             time.sleep(options.delay)
         turns = game.turns
         action = player.action(turns)
+        if player.flag_fallen():
+            # the player ran out of time, its action doesn't count
+            game.flag_fall()
+            print(f"time forfeit ({game.loser}): no time left on the clock")
+            end_reason = 'time'
+            break
         try:
             game.update(action)
         except _InvalidActionException as e:
             # if one of the players makes an invalid action,
             # print the error message
             print(f"invalid action ({game.loser}):", e)
+            end_reason = 'invalid'
             break
+        if record is not None:
+            record.add_action(action)
         print(game)
         opponent.update(action)
         # other player's turn!
         player, opponent = opponent, player
 
     print(f'winner: {game.winner}!')
+    if record is not None:
+        record.end_game(game.winner, end_reason)
+        record.close()
+    for player in (white, black):
+        print(player.report())
 
 # --------------------------------------------------------------------------- #
 
@@ -51,6 +76,9 @@ def main():
 
 # default values (to use if flag is not provided)
 DELAY_DEFAULT = 0
+TIME_DEFAULT = None
+INCREMENT_DEFAULT = 0.0
+RECORD_DEFAULT = None
 
 # missing values (to use if flag is provided, but with no value)
 DELAY_NOVALUE = 1.0
@@ -61,7 +89,8 @@ class _Options:
     Parse and contain command-line arguments.
 
     --- help message: ---
-    usage: referee.py [-h] [-d [DELAY]] white_module black_module
+    usage: referee.py [-h] [-d [DELAY]] [-t TIME] [-i INCREMENT] [-r RECORD]
+                      white_module black_module
 
     Plays a basic game of Watch Your Back! between two Player classes
 
@@ -73,6 +102,15 @@ class _Options:
       -h, --help            show this help message and exit
       -d [DELAY], --delay [DELAY]
                             how long (float, seconds) to wait between turns
+      -t TIME, --time TIME  time bank (float, seconds) of each player for the
+                            whole game, a player out of time loses (default:
+                            no clock)
+      -i INCREMENT, --increment INCREMENT
+                            time (float, seconds) added to the clock of a
+                            player after each of its actions
+      -r RECORD, --record RECORD
+                            file to append the game record to (see
+                            GameRecord.py)
     ---------------------
     """
     def __init__(self):
@@ -86,12 +124,27 @@ class _Options:
         parser.add_argument('-d', '--delay',
                 type=float, default=DELAY_DEFAULT, nargs="?",
                 help="how long (float, seconds) to wait between turns")
+        parser.add_argument('-t', '--time',
+                type=float, default=TIME_DEFAULT,
+                help="time bank (float, seconds) of each player for the whole "
+                    "game, a player out of time loses (default: no clock)")
+        parser.add_argument('-i', '--increment',
+                type=float, default=INCREMENT_DEFAULT,
+                help="time (float, seconds) added to the clock of a player "
+                    "after each of its actions")
+        parser.add_argument('-r', '--record', default=RECORD_DEFAULT,
+                help="file to append the game record to (see GameRecord.py)")
 
         args = parser.parse_args()
 
         self.white_player = _load_player(args.white_module)
         self.black_player = _load_player(args.black_module)
         self.delay = args.delay if args.delay is not None else DELAY_NOVALUE
+        self.time = args.time
+        self.increment = args.increment
+        self.record = args.record
+        self.white_module = args.white_module
+        self.black_module = args.black_module
 
 # HELPERS
 
@@ -335,6 +388,15 @@ class _Game:
             self.winner = 'draw'
             self.phase = 'completed'
 
+    def flag_fall(self):
+        """
+        The player with the current turn has run out of time: it loses the
+        game.
+        """
+        self.phase = 'completed'
+        self.loser  = self._piece()
+        self.winner = self._other()
+
     def _invalidate(self, reason):
         """
         In response to an error, invalidate the game state.
@@ -496,14 +558,58 @@ class _Game:
 # HELPER CLASSES
 
 class _Player:
-    """Wrapper for a Player class to simplify initialization"""
-    def __init__(self, player_class, colour):
+    """
+    Wrapper for a Player class to simplify initialization, and to keep the
+    player's clock: the wall and CPU time of every action are recorded, and
+    with a time bank the time of every action is taken off the clock (and the
+    increment added back after it). The time left is passed to action as the
+    time_left keyword argument, only to Player classes that accept it.
+    """
+    def __init__(self, player_class, colour, time_bank=None, increment=0.0):
         self.player = player_class(colour)
+        self.colour = colour
+        self.time_left = time_bank
+        self.increment = increment
+        self.wall_times = []
+        self.cpu_times = []
+        self._pass_time = time_bank is not None and \
+            _accepts_keyword(player_class.action, 'time_left')
     def update(self, move):
         self.player.update(move)
     def action(self, turns):
-        action = self.player.action(turns)
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        if self._pass_time:
+            action = self.player.action(turns, time_left=self.time_left)
+        else:
+            action = self.player.action(turns)
+        wall = time.perf_counter() - wall_start
+        self.wall_times.append(wall)
+        self.cpu_times.append(time.process_time() - cpu_start)
+        if self.time_left is not None:
+            self.time_left -= wall
+            if not self.flag_fallen():
+                self.time_left += self.increment
         return action
+    def flag_fallen(self):
+        """:return: True iff the player has a clock and no time left on it"""
+        return self.time_left is not None and self.time_left < 0
+    def report(self):
+        """:return: summary of the time the player's actions took"""
+        report = f"{self.colour}: {len(self.wall_times)} actions"
+        for kind, times in (('wall', self.wall_times), ('CPU', self.cpu_times)):
+            mean = sum(times) / len(times) if times else 0.0
+            report += (f", {kind} time {sum(times):.3f}s (mean {mean:.4f}s, "
+                f"max {max(times, default=0.0):.4f}s)")
+        if self.time_left is not None:
+            report += f", {self.time_left:.3f}s left on the clock"
+        return report
+
+def _accepts_keyword(function, name):
+    """:return: True iff function can be called with the keyword argument name"""
+    for parameter in inspect.signature(function).parameters.values():
+        if parameter.name == name or parameter.kind == parameter.VAR_KEYWORD:
+            return True
+    return False
 
 class _InvalidActionException(Exception):
     """For when an action breaks the rules of the game"""
@@ -0,0 +1,279 @@
+# Tournament runner for Watch Your Back!
+# Plays many headless games between Player classes, using the referee's game
+# state to validate every action, and summarises the results.
+
+import csv
+import json
+import time
+import random
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+from referee import _Game, _Player, _load_player, _InvalidActionException
+
+VERSION_INFO = """Tournament runner
+Plays headless games of Watch Your Back! between Player classes
+Run `python tournament.py -h` for help and additional usage information
+"""
+
+def main():
+    """Play every pairing of the given Player modules and write a summary."""
+    options = _Options()
+    print(VERSION_INFO)
+
+    pairings = _schedule(options.modules, options.games)
+    seeds = [_game_seed(options.seed, index) for index in range(len(pairings))]
+    with ProcessPoolExecutor(max_workers=options.jobs) as pool:
+        results = list(pool.map(_play_game, *zip(*pairings), seeds))
+
+    summary = _summarise(results)
+    _write_summary(summary, options.output, options.format)
+    for module, stats in summary['players'].items():
+        print(f"{module}: {stats['wins']} wins, {stats['losses']} losses, "
+              f"{stats['draws']} draws, mean move time {stats['mean_move_time']:.4f}s")
+
+# --------------------------------------------------------------------------- #
+
+# OPTIONS
+
+# default values (to use if flag is not provided)
+GAMES_DEFAULT = 10
+OUTPUT_DEFAULT = 'tournament.json'
+SEED_DEFAULT = 0
+
+
+class _Options:
+    """
+    Parse and contain command-line arguments.
+
+    --- help message: ---
+    usage: tournament.py [-h] [-n GAMES] [-j JOBS] [-o OUTPUT] [-f {json,csv}]
+                         [-s SEED]
+                         modules [modules ...]
+
+    Plays headless games of Watch Your Back! between Player classes
+
+    positional arguments:
+      modules               full names of modules containing Player classes
+                            (two or more, every pair plays each other)
+
+    optional arguments:
+      -h, --help            show this help message and exit
+      -n GAMES, --games GAMES
+                            games per pairing (colours alternate)
+      -j JOBS, --jobs JOBS  number of games played at once (default: one per
+                            CPU)
+      -o OUTPUT, --output OUTPUT
+                            file to write the summary to
+      -f {json,csv}, --format {json,csv}
+                            summary format (default: from the output file
+                            extension)
+      -s SEED, --seed SEED  number the seed of every game is derived from
+    ---------------------
+    """
+    def __init__(self):
+        parser = argparse.ArgumentParser(
+                description="Plays headless games of Watch Your Back! between "
+                    "Player classes")
+        parser.add_argument('modules', nargs='+',
+                help="full names of modules containing Player classes (two "
+                    "or more, every pair plays each other)")
+        parser.add_argument('-n', '--games', type=int, default=GAMES_DEFAULT,
+                help="games per pairing (colours alternate)")
+        parser.add_argument('-j', '--jobs', type=int, default=None,
+                help="number of games played at once (default: one per CPU)")
+        parser.add_argument('-o', '--output', default=OUTPUT_DEFAULT,
+                help="file to write the summary to")
+        parser.add_argument('-f', '--format', choices=['json', 'csv'],
+                default=None,
+                help="summary format (default: from the output file "
+                    "extension)")
+        parser.add_argument('-s', '--seed', type=int, default=SEED_DEFAULT,
+                help="number the seed of every game is derived from")
+
+        args = parser.parse_args()
+        if len(args.modules) < 2:
+            parser.error("at least two Player modules are needed")
+
+        # fail early if a module can't be loaded
+        for module in args.modules:
+            _load_player(module)
+
+        self.modules = args.modules
+        self.games = args.games
+        self.jobs = args.jobs
+        self.output = args.output
+        self.seed = args.seed
+        if args.format is not None:
+            self.format = args.format
+        elif args.output.endswith('.csv'):
+            self.format = 'csv'
+        else:
+            self.format = 'json'
+
+# --------------------------------------------------------------------------- #
+
+# PLAYING
+
+def _schedule(modules, games):
+    """
+    List the games of a round-robin between modules.
+
+    :param modules: names of the Player modules
+    :param games: games per pairing, the modules take turns playing white
+    :return: list of (white module, black module) tuples
+    """
+    pairings = []
+    for first, second in itertools.combinations(modules, 2):
+        for game in range(games):
+            if game % 2 == 0:
+                pairings.append((first, second))
+            else:
+                pairings.append((second, first))
+    return pairings
+
+def _game_seed(seed, index):
+    """
+    :return: the seed of the game with the given index in the schedule, a
+    different one for every game of every tournament seed
+    """
+    return seed << 32 | index
+
+def _play_game(white_module, black_module, seed):
+    """
+    Play one game without printing it.
+
+    :param seed: seed of the random numbers of the game. the players seed the
+    random module with fixed seeds when they are created, which would make
+    every game of a pairing the same, so it is seeded again after them
+    :return: dictionary describing the result of the game: the modules, its
+    seed, winner ('W', 'B' or 'draw'), number of actions played, the reason a
+    player lost by an invalid action (or None), the exception a player lost by
+    raising (or None), and the time each action took for each player
+    """
+    game = _Game()
+    white = _Player(_load_player(white_module), 'white')
+    black = _Player(_load_player(black_module), 'black')
+    random.seed(seed)
+    move_times = {'W': [], 'B': []}
+
+    player, opponent, piece = white, black, 'W'
+    n_actions = 0
+    invalid = None
+    error = None
+    winner = None
+    while game.playing():
+        start = time.perf_counter()
+        try:
+            action = player.action(game.turns)
+        except Exception as e:
+            # a player that crashes loses the game, the other games go on
+            error, winner = _describe_error(e), _other(piece)
+            break
+        move_times[piece].append(time.perf_counter() - start)
+        try:
+            game.update(action)
+        except _InvalidActionException as e:
+            invalid = str(e)
+            break
+        n_actions += 1
+        try:
+            opponent.update(action)
+        except Exception as e:
+            error, winner = _describe_error(e), piece
+            break
+        player, opponent = opponent, player
+        piece = _other(piece)
+
+    if winner is None:
+        winner = game.winner
+    return {'white': white_module, 'black': black_module, 'seed': seed,
+            'winner': winner, 'actions': n_actions, 'invalid': invalid,
+            'error': error,
+            'white_move_times': move_times['W'],
+            'black_move_times': move_times['B']}
+
+def _other(piece):
+    return 'B' if piece == 'W' else 'W'
+
+def _describe_error(e):
+    """
+    :return: the type and message of an exception a player raised
+    """
+    return f"{type(e).__name__}: {e}"
+
+# --------------------------------------------------------------------------- #
+
+# SUMMARY
+
+def _summarise(results):
+    """
+    Collect win/loss/draw counts, game lengths and move latencies per module.
+
+    :param results: list of game results returned by _play_game
+    :return: dictionary with per module statistics ('players') and the
+    results of every game ('games')
+    """
+    players = {}
+    for result in results:
+        for colour, piece in (('white', 'W'), ('black', 'B')):
+            module = result[colour]
+            stats = players.setdefault(module, {'games': 0, 'wins': 0,
+                'losses': 0, 'draws': 0, 'invalid_actions': 0, 'errors': 0,
+                'game_lengths': [], 'move_times': []})
+            stats['games'] += 1
+            stats['game_lengths'].append(result['actions'])
+            stats['move_times'] += result[colour + '_move_times']
+            if result['winner'] == piece:
+                stats['wins'] += 1
+            elif result['winner'] == 'draw':
+                stats['draws'] += 1
+            else:
+                stats['losses'] += 1
+                if result['invalid'] is not None:
+                    stats['invalid_actions'] += 1
+                if result['error'] is not None:
+                    stats['errors'] += 1
+
+    for stats in players.values():
+        lengths = stats.pop('game_lengths')
+        times = stats.pop('move_times')
+        stats['mean_game_length'] = sum(lengths) / len(lengths)
+        stats['moves'] = len(times)
+        stats['mean_move_time'] = sum(times) / len(times) if times else 0.0
+        stats['max_move_time'] = max(times, default=0.0)
+        stats['total_move_time'] = sum(times)
+
+    return {'players': players, 'games': results}
+
+_CSV_FIELDS = ['white', 'black', 'seed', 'winner', 'actions', 'invalid',
+               'error',
+               'white_mean_move_time', 'white_max_move_time',
+               'black_mean_move_time', 'black_max_move_time']
+
+def _write_summary(summary, path, form):
+    """
+    Write the summary as JSON (everything) or CSV (one row per game).
+    """
+    if form == 'json':
+        with open(path, 'w') as f:
+            json.dump(summary, f, indent=2)
+        return
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=_CSV_FIELDS)
+        writer.writeheader()
+        for result in summary['games']:
+            row = {field: result.get(field) for field in _CSV_FIELDS}
+            for colour in ('white', 'black'):
+                times = result[colour + '_move_times']
+                row[colour + '_mean_move_time'] = \
+                    sum(times) / len(times) if times else 0.0
+                row[colour + '_max_move_time'] = max(times, default=0.0)
+            writer.writerow(row)
+
+# --------------------------------------------------------------------------- #
+
+if __name__ == '__main__':
+    main()